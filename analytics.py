@@ -0,0 +1,334 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import numpy as np
+import pandas as pd
+
+TASK_TYPES = ["Instructional Task #1", "Instructional Task #2", "End-of-Unit Performance Task"]
+END_OF_UNIT_TASK = "End-of-Unit Performance Task"
+
+# A gap of more than 14 whole days between responses can start a new instance
+INSTANCE_GAP = np.timedelta64(15, "D")
+
+
+def assign_instances(df, by=None):
+    """Assign instance numbers to tasks based on time gaps and End Unit markers.
+
+    Each task's responses are walked in time order. A response starts a new
+    instance when more than 14 days have passed since the previous response
+    to the same task AND an End-of-Unit response falls strictly between them.
+    Instead of scanning the frame for every row, the End-of-Unit timestamps
+    are sorted once and each gap is tested with two binary searches; the
+    instance number is then a cumulative sum of the gaps that qualify.
+
+    With ``by`` (e.g. "TeacherKey") every group is numbered independently, as
+    if the function had been run on each group's rows separately, but in a
+    single pass over the whole frame.
+    """
+    df = df.copy()
+    instance = np.ones(len(df), dtype=np.int64)
+
+    timestamps = df["Timestamp"].to_numpy()
+    tasks = df["Task"].to_numpy()
+    if by is None:
+        groups = np.zeros(len(df), dtype=np.int64)
+    else:
+        groups = pd.factorize(df[by], use_na_sentinel=False)[0].astype(np.int64)
+
+    # Sort key that orders rows by group, then time: the group code scaled past the
+    # largest timestamp rank. NaT gets the top rank so it sorts last within its group.
+    valid = ~np.isnat(timestamps)
+    unique_times, time_rank = np.unique(timestamps[valid], return_inverse=True)
+    rank = np.full(len(df), len(unique_times), dtype=np.int64)
+    rank[valid] = time_rank
+    key = groups * (len(unique_times) + 1) + rank
+    end_keys = np.sort(key[(tasks == END_OF_UNIT_TASK) & valid])
+
+    for task_type in TASK_TYPES:
+        rows = np.flatnonzero(tasks == task_type)
+        if len(rows) < 2:
+            continue
+
+        # Chronological order within each group (NaT sorts last, as in sort_values)
+        rows = rows[np.argsort(key[rows], kind="stable")]
+        previous, current = rows[:-1], rows[1:]
+        same_group = groups[previous] == groups[current]
+
+        # Comparisons against NaT are False, so missing timestamps never split an instance
+        time_gap = (timestamps[current] - timestamps[previous]) >= INSTANCE_GAP
+        end_unit_between = (
+            np.searchsorted(end_keys, key[current], side="left")
+            - np.searchsorted(end_keys, key[previous], side="right")
+        ) > 0
+
+        # Cumulative count of new instances, restarted at the first row of each group
+        steps = np.concatenate([[0], np.cumsum(same_group & time_gap & end_unit_between)])
+        group_start = np.maximum.accumulate(np.where(np.concatenate([[True], ~same_group]), np.arange(len(rows)), 0))
+        instance[rows] = 1 + steps - steps[group_start]
+
+    df["Instance"] = instance
+    return df
+
+
+def relative_instances(df):
+    """Instance numbers restarted at 1 from the first instance in df for each teacher and task.
+
+    Instances are assigned once over a teacher's full history; within a date
+    range this gives the same numbers as detecting instances on the range
+    alone, because responses and End-of-Unit markers between two in-range
+    responses are themselves in range.
+    """
+    first = df.groupby(["TeacherKey", "Task"], observed=True)["Instance"].transform("min")
+    return df["Instance"] - first + 1
+
+
+class MetricsCube:
+    """Yes/total response counts per (teacher, task, instance, day).
+
+    Counts are stored as running totals along the day axis, so the counts for
+    any From/To range are the difference of two columns found by binary
+    search, without touching the response rows. Memory is proportional to
+    cells x days, not to the number of responses.
+    """
+
+    CELL_COLUMNS = ["TeacherKey", "Task", "Instance"]
+
+    def __init__(self, metrics, cells, days, totals, yes):
+        self.metrics = list(metrics)
+        # One row per (teacher, task, instance); its position is the cell id
+        self.cells = cells
+        # Sorted calendar days that have at least one response
+        self.days = days
+        # Running totals: column k holds the count over days[:k], so column 0 is zero
+        self.totals = totals
+        self.yes = yes
+
+    @classmethod
+    def build(cls, df, metrics):
+        empty = cls(
+            metrics,
+            pd.DataFrame({column: pd.Series(dtype=df[column].dtype) for column in cls.CELL_COLUMNS}),
+            np.array([], dtype="datetime64[D]"),
+            np.zeros((0, 1), dtype=np.int32),
+            np.zeros((len(metrics), 0, 1), dtype=np.int32),
+        )
+        return empty.add(df)
+
+    def add(self, df):
+        """Return a new cube with the rows of df counted in.
+
+        Only the new rows are grouped; existing running totals are widened for
+        any new days and cells and then shifted by the new rows' counts.
+        """
+        df = df[df["Timestamp"].notna()]
+        if len(df) == 0:
+            return self
+
+        keys = df[self.CELL_COLUMNS]
+        new_keys = keys.drop_duplicates()
+        cells = pd.concat([self.cells, new_keys]).drop_duplicates(ignore_index=True)
+        cell_index = pd.MultiIndex.from_frame(cells)
+        cell_ids = cell_index.get_indexer(pd.MultiIndex.from_frame(keys))
+
+        row_days = df["Timestamp"].to_numpy().astype("datetime64[D]")
+        days = np.union1d(self.days, row_days)
+        day_ids = np.searchsorted(days, row_days)
+
+        # Widen the existing running totals: new days repeat the total before them,
+        # new cells start at zero
+        columns = np.concatenate([[0], np.searchsorted(self.days, days, side="right")])
+        totals = self._widen(self.totals, columns, len(cells))
+        yes = np.stack([self._widen(self.yes[m], columns, len(cells)) for m in range(len(self.metrics))]) \
+            if self.metrics else np.zeros((0, len(cells), len(days) + 1), dtype=np.int32)
+
+        flat = cell_ids * len(days) + day_ids
+        size = len(cells) * len(days)
+        totals[:, 1:] += self._running(np.bincount(flat, minlength=size), len(cells))
+        for m, metric in enumerate(self.metrics):
+            answered_yes = df[metric].fillna(False).to_numpy(dtype=bool)
+            yes[m, :, 1:] += self._running(np.bincount(flat[answered_yes], minlength=size), len(cells))
+
+        return MetricsCube(self.metrics, cells, days, totals, yes)
+
+    @staticmethod
+    def _widen(running, columns, n_cells):
+        widened = np.zeros((n_cells, len(columns)), dtype=np.int32)
+        widened[:running.shape[0]] = running[:, columns]
+        return widened
+
+    @staticmethod
+    def _running(counts, n_cells):
+        return counts.reshape(n_cells, -1).cumsum(axis=1, dtype=np.int32)
+
+    def query(self, start=None, end=None, teacher=None):
+        """Counts per cell for days from start to end inclusive, dropping empty cells.
+
+        Returns the cell columns plus ``Total`` and one yes-count column per metric.
+        """
+        lo = 0 if start is None else np.searchsorted(self.days, np.datetime64(start, "D"), side="left")
+        hi = len(self.days) if end is None else np.searchsorted(self.days, np.datetime64(end, "D"), side="right")
+        hi = max(hi, lo)
+
+        counts = self.cells.copy()
+        counts["Total"] = self.totals[:, hi] - self.totals[:, lo]
+        for m, metric in enumerate(self.metrics):
+            counts[metric] = self.yes[m, :, hi] - self.yes[m, :, lo]
+
+        mask = counts["Total"] > 0
+        if teacher is not None:
+            mask &= counts["TeacherKey"] == teacher
+        return counts[mask].reset_index(drop=True)
+
+
+class TimeIndex:
+    """A frame partitioned by teacher and sorted by time within each teacher.
+
+    Every teacher's rows form one contiguous block ordered by Timestamp
+    (missing timestamps last), so a teacher plus date range resolves with
+    two binary searches to a single ``iloc`` slice instead of boolean masks
+    over every row.
+    """
+
+    def __init__(self, df, key="TeacherKey"):
+        codes = df[key].cat.codes.to_numpy()
+        times = df["Timestamp"].to_numpy()
+        sort_times = times.view("i8").copy()
+        sort_times[np.isnat(times)] = np.iinfo(np.int64).max
+
+        order = np.lexsort((sort_times, codes))
+        if np.any(order != np.arange(len(order))):
+            df, codes, sort_times = df.iloc[order], codes[order], sort_times[order]
+
+        self.df = df
+        self.key = key
+        self._time_dtype = times.dtype
+        self._times = sort_times
+        categories = df[key].cat.categories
+        starts = np.searchsorted(codes, np.arange(len(categories)), side="left")
+        stops = np.searchsorted(codes, np.arange(len(categories)), side="right")
+        self._bounds = {
+            teacher: (start, stop)
+            for teacher, start, stop in zip(categories, starts, stops)
+            if stop > start
+        }
+
+    @property
+    def teachers(self):
+        """Teacher keys that have at least one row"""
+        return list(self._bounds)
+
+    def time_range(self):
+        """Earliest and latest timestamp, or (NaT, NaT) if there are none"""
+        valid = self._times[self._times != np.iinfo(np.int64).max]
+        if len(valid) == 0:
+            return pd.NaT, pd.NaT
+        bounds = np.array([valid.min(), valid.max()]).view(self._time_dtype)
+        return pd.Timestamp(bounds[0]), pd.Timestamp(bounds[1])
+
+    def slice(self, start, stop, teacher=None):
+        """Rows with start <= Timestamp < stop, for one teacher or for all of them"""
+        lo_time, hi_time = self._to_int(start), self._to_int(stop)
+        if teacher is not None:
+            return self.df.iloc[slice(*self._locate(teacher, lo_time, hi_time))]
+
+        parts = [self._locate(teacher, lo_time, hi_time) for teacher in self._bounds]
+        return pd.concat([self.df.iloc[lo:hi] for lo, hi in parts]) if parts else self.df.iloc[0:0]
+
+    def _locate(self, teacher, lo_time, hi_time):
+        start, stop = self._bounds.get(teacher, (0, 0))
+        block = self._times[start:stop]
+        return (
+            start + np.searchsorted(block, lo_time, side="left"),
+            start + np.searchsorted(block, hi_time, side="left"),
+        )
+
+    def _to_int(self, value):
+        return np.datetime64(pd.Timestamp(value)).astype(self._time_dtype).view("i8")
+
+
+class PairCounts:
+    """2x2 contingency counts for every pair of Yes/No items.
+
+    For items i and j, over the rows where both were answered: ``n[i, j]``
+    rows, ``yes[i, j]`` of them with i = Yes, and ``both[i, j]`` with both
+    Yes. For binary items the Pearson correlation (phi) follows from these
+    counts alone, with the same pairwise handling of blanks as
+    ``DataFrame.corr``, and counts from disjoint row sets simply add up.
+    """
+
+    def __init__(self, items, n, yes, both):
+        self.items = list(items)
+        self.n = n
+        self.yes = yes
+        self.both = both
+
+    @classmethod
+    def by_group(cls, df, items, by="Task"):
+        """Counts for each value of ``by`` from one matrix pass over df.
+
+        Rows are sorted by group once; each group is then a contiguous block
+        whose counts are three small matrix products over indicator columns.
+        """
+        answers = df[items]
+        answered = answers.notna().to_numpy(dtype=np.float64)
+        yes = answers.fillna(False).to_numpy(dtype=np.float64)
+
+        codes, groups = pd.factorize(df[by], sort=True)
+        order = np.argsort(codes, kind="stable")
+        answered, yes, codes = answered[order], yes[order], codes[order]
+        bounds = np.searchsorted(codes, np.arange(len(groups) + 1))
+
+        counts = {}
+        for g, group in enumerate(groups):
+            block = slice(bounds[g], bounds[g + 1])
+            a, y = answered[block], yes[block]
+            counts[group] = cls(items, (a.T @ a).astype(np.int64), (y.T @ a).astype(np.int64), (y.T @ y).astype(np.int64))
+        return counts
+
+    @classmethod
+    def total(cls, parts, items):
+        """Sum of counts over disjoint row sets"""
+        size = (len(items), len(items))
+        result = cls(items, np.zeros(size, np.int64), np.zeros(size, np.int64), np.zeros(size, np.int64))
+        for part in parts:
+            result.n += part.n
+            result.yes += part.yes
+            result.both += part.both
+        return result
+
+    def phi(self):
+        """Correlation matrix; NaN where an item has no variance among the shared rows"""
+        n, yes_i, both = self.n.astype(np.float64), self.yes.astype(np.float64), self.both
+        yes_j = yes_i.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = (n * both - yes_i * yes_j) / np.sqrt(yes_i * (n - yes_i) * yes_j * (n - yes_j))
+        return pd.DataFrame(r, index=self.items, columns=self.items)
+
+    def confidence_interval(self, z=1.96):
+        """Lower and upper bounds of each correlation from the Fisher z-transform (95% by default)"""
+        r = self.phi().to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            center = np.arctanh(np.clip(r, -0.999999, 0.999999))
+            margin = z / np.sqrt(self.n - 3)
+            low, high = np.tanh(center - margin), np.tanh(center + margin)
+        # Too few shared rows for an interval, or an item against itself
+        low[self.n <= 3] = high[self.n <= 3] = np.nan
+        np.fill_diagonal(low, np.nan)
+        np.fill_diagonal(high, np.nan)
+        return (
+            pd.DataFrame(low, index=self.items, columns=self.items),
+            pd.DataFrame(high, index=self.items, columns=self.items),
+        )
@@ -0,0 +1,121 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import re
+import threading
+import time
+
+# "Sheet name!A2:M" or "Sheet name!A5:M6"; the end row is optional
+_A1_RANGE = re.compile(r"^(?P<sheet>.+)!(?P<first_col>[A-Z]+)(?P<first_row>\d+):(?P<last_col>[A-Z]+)(?P<last_row>\d*)$")
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+class _Request:
+    def __init__(self, execute):
+        self.execute = execute
+
+
+class _Batch:
+    # Like googleapiclient's BatchHttpRequest: one round trip, a callback per request
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request, callback or self._callback, request_id or str(len(self._requests))))
+
+    def execute(self):
+        self._service._round_trip()
+        for request, callback, request_id in self._requests:
+            try:
+                response, exception = request.execute(round_trip=False), None
+            except Exception as error:
+                response, exception = None, error
+            callback(request_id, response, exception)
+
+
+class FakeSheetsService:
+    """Local stand-in for the ``service.spreadsheets().values().get`` part of the Sheets v4 client.
+
+    ``sheets`` maps a spreadsheet id to its data rows; row 1 is taken to be
+    the header, so the first data row is sheet row 2, as in the live forms.
+    Responses go through a JSON round trip like the real client's, and
+    ``latency`` adds a fixed delay per HTTP round trip. ``requests`` records
+    every range asked for and ``round_trips`` counts HTTP requests, where a
+    batch from ``new_batch_http_request`` is one.
+    """
+
+    def __init__(self, sheets, latency=0.0):
+        self.sheets = {spreadsheet_id: list(rows) for spreadsheet_id, rows in sheets.items()}
+        self.latency = latency
+        self.requests = []
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def append(self, spreadsheet_id, rows):
+        """New form submissions at the bottom of a sheet"""
+        with self._lock:
+            self.sheets[spreadsheet_id].extend(rows)
+
+    # The client's resource chain: service.spreadsheets().values().get(...)
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, range):
+        return _Request(lambda round_trip=True: self._get(spreadsheetId, range, round_trip))
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self, callback)
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _get(self, spreadsheet_id, range_name, round_trip=True):
+        match = _A1_RANGE.match(range_name)
+        if match is None:
+            raise ValueError(f"Unable to parse range: {range_name}")
+        if round_trip:
+            self._round_trip()
+
+        with self._lock:
+            self.requests.append((spreadsheet_id, range_name))
+            rows = self.sheets[spreadsheet_id]
+            first = int(match["first_row"]) - 2
+            last = int(match["last_row"]) - 1 if match["last_row"] else len(rows)
+            selected = rows[max(first, 0):last]
+
+        first_col = _column_number(match["first_col"]) - 1
+        last_col = _column_number(match["last_col"])
+        values = [row[first_col:last_col] for row in selected]
+        body = {"range": range_name, "majorDimension": "ROWS"}
+        if values:
+            # Like the API, leave "values" out entirely when the range is empty
+            body["values"] = values
+        return json.loads(json.dumps(body))
@@ -0,0 +1,69 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+# The row-by-row instance detector the dashboard used before
+# analytics.assign_instances, kept as the reference the vectorized version
+# is checked against. It is quadratic, so only run it on small frames.
+import pandas as pd
+
+from analytics import END_OF_UNIT_TASK, TASK_TYPES
+
+
+def assign_instances_loop(df):
+    """Assign instance numbers to tasks based on time gaps and End Unit markers"""
+    df = df.copy()
+    df['Instance'] = 1
+
+    for task_type in TASK_TYPES:
+        task_mask = df['Task'] == task_type
+        task_dates = df[task_mask]['Timestamp'].sort_values()
+
+        if len(task_dates) == 0:
+            continue
+
+        instance_num = 1
+        last_date = None
+
+        for idx in task_dates.index:
+            current_date = df.loc[idx, 'Timestamp']
+
+            if last_date is not None:
+                # Check for time gap (>14 days)
+                time_gap = (current_date - last_date).days > 14
+
+                # Check if End Unit occurred between last_date and current_date
+                end_unit_between = (
+                    (df['Task'] == END_OF_UNIT_TASK) &
+                    (df['Timestamp'] > last_date) &
+                    (df['Timestamp'] < current_date)
+                ).any()
+
+                # New instance if BOTH conditions met
+                if time_gap and end_unit_between:
+                    instance_num += 1
+
+            df.loc[idx, 'Instance'] = instance_num
+            last_date = current_date
+
+    return df
+
+
+def assign_instances_loop_by(df, by):
+    """The loop run on each group separately, as the dashboard did per teacher"""
+    if len(df) == 0:
+        return assign_instances_loop(df)
+    parts = [assign_instances_loop(part) for _, part in df.groupby(by, observed=True)]
+    return pd.concat(parts).reindex(df.index)
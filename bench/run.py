@@ -0,0 +1,252 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+# Stage timings on synthetic data, from the repository root:
+#
+#     python -m bench.run --sizes 1000 10000 100000 1000000
+#
+# Each stage of a dashboard load and render is timed on generated sheets
+# served by a local fake of the Sheets API, so no credentials are needed.
+# Every run is saved to bench/results/ (ignored by git, since timings are
+# only comparable on one machine) and compared against the previous
+# run; stages more than --threshold times slower are reported and the exit
+# status is 1. The pre-vectorized instance loop is timed on the smaller
+# sizes and its output checked against analytics.assign_instances.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from analytics import MetricsCube, TimeIndex, assign_instances
+from bench.fake_sheets import FakeSheetsService
+from bench.legacy import assign_instances_loop_by
+from bench.synthetic import student_rows, teacher_rows
+from charts import (
+    COMPARISON_METRICS, comparison_figure, quadrant_figure, scatter_figure, task_points, teacher_rates, trend_figure,
+)
+from compute import ALL_TASKS, TEACHERS, correlations, metric_percentages, select, task_table
+from data_store import (
+    FIRST_DATA_ROW, STUDENT_SHEET, STUDENT_SHEET_ID, TEACHER_SHEET, TEACHER_SHEET_ID, YES_NO_COLUMNS,
+    DataSnapshot, parse_student_values, parse_teacher_values, sheet_range,
+)
+from prompts import build_data_context, build_question_context
+from search import COMMENT_COLUMNS, REFLECTION_COLUMNS, TextIndex
+from sheets_client import SheetsClient, TokenBucket
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# One teacher reflection for about every 50 student responses
+REFLECTIONS_PER_RESPONSE = 1 / 50
+# Questions for the search and prompt stages
+QUESTION = "Why were students confused about the instructions?"
+# Range the single-teacher and date-filter stages select: a month mid-year
+RANGE_START = pd.Timestamp("2025-10-01").date()
+RANGE_END = pd.Timestamp("2025-10-31").date()
+# Slowdowns smaller than this are not reported as regressions
+NOISE_SECONDS = 0.005
+
+
+def timed(fn, repeat):
+    """Best wall time of ``repeat`` calls, and the last call's result"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_size(n, repeat, legacy_limit):
+    """Time every stage on n student rows; returns {stage: seconds}"""
+    service = FakeSheetsService({
+        STUDENT_SHEET_ID: student_rows(n),
+        TEACHER_SHEET_ID: teacher_rows(max(int(n * REFLECTIONS_PER_RESPONSE), 20)),
+    })
+    stages = {}
+
+    def stage(name, fn, times=repeat):
+        stages[name], result = timed(fn, times)
+        print(f"{n:>9,} {name:<22} {stages[name] * 1000:>10.1f} ms", flush=True)
+        return result
+
+    # The app's client, minus the quota pacing a benchmark would only be measuring
+    client = SheetsClient(lambda: service, bucket=TokenBucket(rate=1e9, capacity=1e9))
+    student_values, teacher_values = stage("fetch", lambda: client.get_many([
+        (STUDENT_SHEET_ID, sheet_range(STUDENT_SHEET.last_column)),
+        (TEACHER_SHEET_ID, sheet_range(TEACHER_SHEET.last_column)),
+    ]))
+    # A refresh that finds nothing new: both sheets' last rows in one batch
+    stage("freshness_probe", lambda: client.batch_get([
+        (STUDENT_SHEET_ID, sheet_range(STUDENT_SHEET.last_column, FIRST_DATA_ROW + len(student_values) - 1)),
+        (TEACHER_SHEET_ID, sheet_range(TEACHER_SHEET.last_column, FIRST_DATA_ROW + len(teacher_values) - 1)),
+    ]))
+    # Parsing drops responses naming teachers who are not on the roster
+    student_df, teacher_df = stage("parse", lambda: (
+        parse_student_values(student_values, TEACHERS),
+        parse_teacher_values(teacher_values, TEACHERS),
+    ))
+    student_df = stage("assign_instances", lambda: assign_instances(student_df, by="TeacherKey"))
+
+    if n <= legacy_limit:
+        legacy = stage("assign_instances_loop", lambda: assign_instances_loop_by(student_df, "TeacherKey"), times=1)
+        if not np.array_equal(legacy["Instance"].to_numpy(), student_df["Instance"].to_numpy()):
+            raise AssertionError(f"assign_instances differs from the reference loop at {n} rows")
+
+    students, teachers = stage("time_index", lambda: (TimeIndex(student_df), TimeIndex(teacher_df)))
+    cube = stage("aggregate", lambda: MetricsCube.build(student_df, YES_NO_COLUMNS))
+    comment_index, reflection_index = stage("text_index", lambda: (
+        TextIndex.build(student_df, COMMENT_COLUMNS),
+        TextIndex.build(teacher_df, REFLECTION_COLUMNS),
+    ), times=1)
+
+    snapshot = DataSnapshot(
+        students=students, teachers=teachers, version="bench", loaded_at=time.time(), cube=cube,
+        comment_index=comment_index, reflection_index=reflection_index,
+    )
+    first, last = students.time_range()
+    teacher = students.teachers[0]
+
+    # A teacher's whole history, then every teacher over one month (the admin view)
+    stage("teacher_filter", lambda: select(snapshot, teacher, first.date(), last.date()))
+    selection = stage("date_filter", lambda: select(snapshot, None, RANGE_START, RANGE_END))
+
+    stage("metrics", lambda: (
+        metric_percentages(selection.counts, YES_NO_COLUMNS),
+        task_table(selection.counts, YES_NO_COLUMNS),
+    ))
+    stage("correlation", lambda: {
+        task: (pairs.phi(), pairs.confidence_interval()) for task, pairs in correlations(selection.responses).items()
+    })
+
+    def figures():
+        points = task_points(selection.counts)
+        percent, totals = teacher_rates(selection.counts, COMPARISON_METRICS)[ALL_TASKS]
+        return (
+            trend_figure(selection.counts), quadrant_figure(points), scatter_figure(points),
+            comparison_figure(percent, totals),
+        )
+    stage("figures", figures)
+
+    stage("search", lambda: comment_index.search(QUESTION, limit=15, within=selection.responses.index))
+    def prompt():
+        # The admin prompt: the latest reflections from the whole sheet, then the best matches
+        data_context = build_data_context(
+            selection.responses, selection.counts, reflections=teachers.df.nlargest(10, "Timestamp")
+        )
+        return data_context, build_question_context(
+            selection.responses,
+            reflections=teachers.df.loc[reflection_index.search(QUESTION, limit=10)],
+            relevant_comments=comment_index.search(QUESTION, limit=15, within=selection.responses.index),
+        )
+    stage("prompt", prompt)
+    return stages
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def environment():
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save(results, directory):
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(directory, f"{stamp}-{results['environment']['commit'] or 'nogit'}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def previous_run(directory, exclude):
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(".json") and os.path.join(directory, name) != exclude
+    ) if os.path.isdir(directory) else []
+    return paths[-1] if paths else None
+
+
+def compare(results, baseline, threshold):
+    """Print stage timings against the baseline run; returns the regressed (size, stage) pairs"""
+    regressions = []
+    print(f"\nCompared with {baseline['environment'].get('commit') or 'unknown commit'} ({baseline['created']}):")
+    for size, stages in results["sizes"].items():
+        before = baseline["sizes"].get(size, {})
+        for name, seconds in stages.items():
+            if name not in before:
+                continue
+            ratio = seconds / before[name] if before[name] > 0 else float("inf")
+            # A few milliseconds either way is timer and scheduler noise
+            regressed = ratio > threshold and seconds - before[name] > NOISE_SECONDS
+            if regressed:
+                regressions.append((size, name))
+            print(f"{int(size):>9,} {name:<22} {before[name] * 1000:>10.1f} -> {seconds * 1000:>10.1f} ms"
+                  f"  x{ratio:.2f}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each dashboard stage on synthetic sheets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="student rows per run")
+    parser.add_argument("--repeat", type=int, default=3, help="calls per stage; the fastest is kept")
+    parser.add_argument("--legacy-limit", type=int, default=5_000,
+                        help="largest size to run the quadratic reference instance loop on")
+    parser.add_argument("--results", default=RESULTS_DIR, help="directory the runs are saved in")
+    parser.add_argument("--baseline", help="run to compare against (default: the previous saved run)")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio reported as a regression (default: 1.25)")
+    parser.add_argument("--no-save", action="store_true", help="compare without saving this run")
+    args = parser.parse_args(argv)
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "repeat": args.repeat,
+        "sizes": {str(n): run_size(n, args.repeat, args.legacy_limit) for n in args.sizes},
+    }
+
+    path = None if args.no_save else save(results, args.results)
+    if path:
+        print(f"\nSaved {path}")
+    baseline_path = args.baseline or previous_run(args.results, exclude=path)
+    if baseline_path is None:
+        return 0
+    with open(baseline_path) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+# Synthetic form responses in the raw shape the Sheets API returns: lists of
+# strings, one per row, with trailing empty cells dropped. Each teacher runs
+# the same unit cycle (T1, then T2, then the End-of-Unit task) so instance
+# detection has real cycles to find, and a few rows name teachers who are not
+# on the roster so the teacher filter has something to drop.
+import numpy as np
+import pandas as pd
+
+from analytics import TASK_TYPES
+from compute import TEACHERS
+from data_store import STUDENT_COLUMNS, TEACHER_COLUMNS, TIMESTAMP_FORMAT
+
+SCHOOL_YEAR_START = pd.Timestamp("2025-08-18 08:00")
+SCHOOL_YEAR_DAYS = 180
+# Days into each unit that every task runs; the gaps between a task's runs
+# in consecutive units are over 14 days with an End-of-Unit task in between
+UNIT_DAYS = 28
+TASK_DAYS = [(0, 10), (10, 20), (20, 25)]
+# Late submissions come in up to this many days after a task's window. Any
+# later and the gap to the next unit's run would be 14 days or less
+LATE_DAYS = 3
+UNLISTED_TEACHERS = ["smith", "garcia", "nguyen"]
+UNLISTED_SHARE = 0.03
+YES_NO_ANSWERS = np.array(["Yes", "No", ""])
+LIKED_TEXT = np.array([
+    "", "", "working with my partner", "the group work was fun", "I finally understood the graphs",
+    "we got to choose our own problem", "building the model", "presenting to the class",
+    "the hands-on experiment", "explaining my thinking",
+])
+DISLIKED_TEXT = np.array([
+    "", "", "", "too much reading", "it was confusing at first", "not enough time to finish",
+    "my partner did not help", "the instructions were unclear", "too hard",
+])
+PARTNER_REASONS = np.array(["they did not listen", "they were off task", "we disagreed a lot"])
+REFLECTION_TEXT = {
+    "WentWell": ["students were engaged in discussion", "partner work went smoothly", "most groups finished early"],
+    "Struggled": ["pacing was too fast", "students struggled with the vocabulary", "materials ran short"],
+    "Concerns": ["", "a few students were absent", "grouping needs work"],
+    "Revisions": ["", "add a warm-up", "split the task over two days", "model the first step"],
+    "Principles": ["P1, P3", "P2", "P4, P5"],
+    "Other": ["", "", "shortened period"],
+}
+
+
+def _timestamps(rng, n, hour_start, hours):
+    # School days in order, each with a random time inside the school day
+    days = np.sort(rng.integers(0, SCHOOL_YEAR_DAYS, n))
+    seconds = days * 86400 + rng.integers(hour_start * 3600, (hour_start + hours) * 3600, n)
+    times = SCHOOL_YEAR_START.normalize() + pd.to_timedelta(np.sort(seconds), unit="s")
+    return days, pd.Series(times).dt.strftime(TIMESTAMP_FORMAT).to_numpy()
+
+
+def _tasks(rng, days, teacher_codes, late=0.05):
+    # Each teacher's units start on a different day so their cycles don't line up
+    unit_day = (days + teacher_codes * 3) % UNIT_DAYS
+    # Days between units are End-of-Unit stragglers
+    tasks = np.full(len(days), TASK_TYPES[-1], dtype=object)
+    for task_type, (first, last) in zip(TASK_TYPES, TASK_DAYS):
+        tasks[(unit_day >= first) & (unit_day < last)] = task_type
+    # A share of the responses just after a task's window are late ones for it.
+    # They stay inside the unit, so every task keeps its cycles at any n
+    is_late = rng.random(len(days)) < late
+    for task_type, (_, last) in zip(TASK_TYPES[:-1], TASK_DAYS):
+        tasks[is_late & (unit_day >= last) & (unit_day < last + LATE_DAYS)] = task_type
+    return tasks
+
+
+def _rows(columns):
+    # The API leaves trailing empty cells out of each row
+    rows = []
+    for row in zip(*columns):
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        rows.append(row)
+    return rows
+
+
+def _teachers(rng, n, teachers):
+    names = np.array(list(teachers) + UNLISTED_TEACHERS)
+    weights = np.concatenate([
+        np.full(len(teachers), (1 - UNLISTED_SHARE) / len(teachers)),
+        np.full(len(UNLISTED_TEACHERS), UNLISTED_SHARE / len(UNLISTED_TEACHERS)),
+    ])
+    codes = rng.choice(len(names), n, p=weights)
+    return names, codes
+
+
+def student_rows(n, teachers=TEACHERS, seed=0):
+    """n raw rows shaped like the 13-column student exit ticket sheet"""
+    rng = np.random.default_rng(seed)
+    days, timestamps = _timestamps(rng, n, hour_start=8, hours=7)
+    names, codes = _teachers(rng, n, teachers)
+    # Students type the name: mixed case and stray spaces, as in the live form
+    typed = np.char.add(np.where(rng.random(n) < 0.7, np.char.capitalize(names[codes]), names[codes]),
+                        np.where(rng.random(n) < 0.1, " ", ""))
+
+    def answers(yes=0.6):
+        return YES_NO_ANSWERS[rng.choice(3, n, p=[yes, 0.98 - yes, 0.02])]
+
+    liked_partner = answers(0.75)
+    reasons = np.where(liked_partner == "No", PARTNER_REASONS[rng.integers(0, len(PARTNER_REASONS), n)], "")
+    columns = [
+        timestamps,
+        typed,
+        rng.choice(["6", "7", "8"], n),
+        _tasks(rng, days, codes),
+        liked_partner,
+        reasons,
+        answers(),   # Choice
+        answers(),   # ShowLearning
+        answers(0.7),  # Engaged
+        answers(0.3),  # Confused
+        answers(0.65),  # Prepared
+        LIKED_TEXT[rng.integers(0, len(LIKED_TEXT), n)],
+        DISLIKED_TEXT[rng.integers(0, len(DISLIKED_TEXT), n)],
+    ]
+    assert len(columns) == len(STUDENT_COLUMNS)
+    return _rows(columns)
+
+
+def teacher_rows(n, teachers=TEACHERS, seed=1):
+    """n raw rows shaped like the 11-column teacher reflection sheet"""
+    rng = np.random.default_rng(seed)
+    days, timestamps = _timestamps(rng, n, hour_start=15, hours=3)
+    names, codes = _teachers(rng, n, teachers)
+    last_names = np.char.capitalize(names[codes])
+
+    def text(column):
+        choices = np.array(REFLECTION_TEXT[column])
+        return choices[rng.integers(0, len(choices), n)]
+
+    columns = [
+        timestamps,
+        np.char.add(names[codes], "@school.example.org"),
+        np.char.add(rng.choice(["Pat ", "Sam ", "Alex ", "Jo "], n), last_names),
+        rng.choice(["6", "7", "8"], n),
+        _tasks(rng, days, codes),
+        text("WentWell"),
+        text("Struggled"),
+        text("Concerns"),
+        text("Revisions"),
+        text("Principles"),
+        text("Other"),
+    ]
+    assert len(columns) == len(TEACHER_COLUMNS)
+    return _rows(columns)
@@ -0,0 +1,248 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from analytics import TASK_TYPES, relative_instances
+from prompts import task_label
+
+# Solarized Light theme colors
+BG_COLOR = "#fdf6e3"
+TEXT_COLOR = "#657b83"
+PLOT_BG = "#eee8d5"
+GRID_COLOR = "#93a1a1"
+
+TREND_METRICS = ["Engaged", "Confused", "Choice", "Prepared"]
+TREND_COLORS = {
+    "Engaged": "#ffffff",
+    "Confused": "#cccccc",
+    "Choice": "#999999",
+    "Prepared": "#666666",
+}
+# Yes/No items compared across teachers in the admin heatmap
+COMPARISON_METRICS = ["Engaged", "Confused", "Choice", "Prepared", "LikedPartner", "ShowLearning"]
+# Marker label, symbol and color for each task in the quadrant and scatter plots
+TASK_MARKERS = {
+    "Instructional Task #1": ("T1", "circle", "#268bd2"),
+    "Instructional Task #2": ("T2", "square", "#cb4b16"),
+    "End-of-Unit Performance Task": ("End", "diamond", "#859900"),
+}
+
+
+def trend_rows(counts):
+    """Percent yes per metric for every task instance in the cube counts.
+
+    Instances are detected per teacher once per data version; here they are
+    renumbered from the start of the selected range. In the aggregated admin
+    view this lines up each teacher's cycles, so "T1 I2" is every teacher's
+    second T1 cycle.
+    """
+    instance_counts = (
+        counts.assign(Instance=relative_instances(counts))
+        .groupby(["Task", "Instance"], observed=True)
+        .sum(numeric_only=True)
+    )
+
+    rows = []
+    for task_type in TASK_TYPES:
+        if task_type not in instance_counts.index.get_level_values("Task"):
+            continue
+        task_counts = instance_counts.loc[task_type]
+        # Only show instance numbers when the task ran more than once
+        numbered = task_counts.index.max() > 1
+
+        for instance_num, instance_data in task_counts.iterrows():
+            label = f"{task_label(task_type)} I{int(instance_num)}" if numbered else task_label(task_type)
+            total_count = instance_data["Total"]
+            for metric in TREND_METRICS:
+                yes_count = instance_data[metric]
+                rows.append({
+                    "Instance": label,
+                    "Metric": metric,
+                    "Percentage": yes_count / total_count * 100 if total_count > 0 else 0,
+                    "Count": f"({yes_count}/{total_count})",
+                })
+    return pd.DataFrame(rows, columns=["Instance", "Metric", "Percentage", "Count"])
+
+
+def trend_figure(counts):
+    """Grouped bars of each metric per task instance, or None without data"""
+    rows = trend_rows(counts)
+    if len(rows) == 0:
+        return None
+
+    # Bar chart instead of line chart for discrete instances
+    fig = px.bar(
+        rows,
+        x="Instance",
+        y="Percentage",
+        color="Metric",
+        barmode="group",
+        range_y=[0, 100],
+        custom_data=["Count"],
+        color_discrete_map=TREND_COLORS,
+    )
+    fig.update_traces(
+        hovertemplate="<b>%{fullData.name}</b><br>%{y:.0f}% %{customdata[0]}<extra></extra>",
+        # Prevent clipping of markers at edges
+        cliponaxis=False,
+    )
+    fig.update_layout(
+        yaxis_title="Percent",
+        xaxis_title="",
+        height=300,
+        margin=dict(l=40, r=20, t=30, b=40),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        paper_bgcolor=PLOT_BG,
+        plot_bgcolor=PLOT_BG,
+        font=dict(color=TEXT_COLOR),
+        xaxis=dict(gridcolor=GRID_COLOR),
+        yaxis=dict(gridcolor=GRID_COLOR, range=[0, 100]),
+    )
+    return fig
+
+
+def task_points(counts):
+    """Percent confused and percent prepared per task, computed once for both task plots"""
+    by_task = counts.groupby("Task", observed=True).sum(numeric_only=True)
+    points = []
+    for task_type, (label, symbol, color) in TASK_MARKERS.items():
+        if task_type not in by_task.index:
+            continue
+        total = by_task.loc[task_type, "Total"]
+        points.append({
+            "label": label,
+            "symbol": symbol,
+            "color": color,
+            "confused": by_task.loc[task_type, "Confused"] / total * 100 if total > 0 else 0,
+            "prepared": by_task.loc[task_type, "Prepared"] / total * 100 if total > 0 else 0,
+        })
+    return points
+
+
+def _task_figure(points):
+    fig = go.Figure()
+    for point in points:
+        fig.add_trace(go.Scatter(
+            x=[point["confused"]],
+            y=[point["prepared"]],
+            mode="markers+text",
+            marker=dict(size=15, color=point["color"], symbol=point["symbol"], opacity=0.7),
+            text=[point["label"]],
+            textposition="top center",
+            textfont=dict(size=12, color=TEXT_COLOR),
+            showlegend=False,
+            hovertemplate=(
+                f"<b>{point['label']}</b><br>Prepared: {point['prepared']:.1f}%"
+                f"<br>Confused: {point['confused']:.1f}%<extra></extra>"
+            ),
+        ))
+    return fig
+
+
+def quadrant_figure(points):
+    """All tasks on one Prepared vs Confused quadrant with labelled corners"""
+    fig = _task_figure(points)
+    fig.add_hline(y=50, line_color=GRID_COLOR, line_width=1)
+    fig.add_vline(x=50, line_color=GRID_COLOR, line_width=1)
+
+    corners = [
+        (25, 75, "More Prepared<br>Less Confused"),
+        (75, 75, "More Prepared<br>More Confused"),
+        (25, 25, "Less Prepared<br>Less Confused"),
+        (75, 25, "Less Prepared<br>More Confused"),
+    ]
+    for x, y, text in corners:
+        fig.add_annotation(x=x, y=y, text=text, showarrow=False, font=dict(size=14, color=TEXT_COLOR), opacity=0.7)
+
+    fig.update_layout(
+        xaxis=dict(range=[0, 100], showgrid=False, showticklabels=False, zeroline=False),
+        yaxis=dict(range=[0, 100], showgrid=False, showticklabels=False, zeroline=False),
+        height=450,
+        margin=dict(l=20, r=20, t=20, b=20),
+        paper_bgcolor=PLOT_BG,
+        plot_bgcolor=PLOT_BG,
+        font=dict(color=TEXT_COLOR, size=10),
+    )
+    return fig
+
+
+def scatter_figure(points):
+    """The same task points on labelled percent axes"""
+    fig = _task_figure(points)
+    # Quadrant reference lines
+    fig.add_hline(y=50, line_dash="dot", line_color=GRID_COLOR, opacity=0.5)
+    fig.add_vline(x=50, line_dash="dot", line_color=GRID_COLOR, opacity=0.5)
+
+    fig.update_layout(
+        xaxis_title="% Confused",
+        yaxis_title="% Prepared",
+        xaxis=dict(range=[0, 100], showgrid=False),
+        yaxis=dict(range=[0, 100], showgrid=False),
+        height=450,
+        margin=dict(l=40, r=20, t=30, b=40),
+        paper_bgcolor=PLOT_BG,
+        plot_bgcolor=PLOT_BG,
+        font=dict(color=TEXT_COLOR, size=10),
+    )
+    return fig
+
+
+def teacher_rates(counts, metrics):
+    """Percent Yes per teacher and metric, for each task and for all tasks together.
+
+    One grouped pass over the cube counts gives every (teacher, task) total;
+    the per-task tables and the all-task table are cut from that. Returns
+    ``{task or "All Tasks": (percent frame, responses per teacher)}``.
+    """
+    by_cell = counts.groupby(["TeacherKey", "Task"], observed=True)[["Total"] + metrics].sum()
+    tables = {"All Tasks": by_cell.groupby(level="TeacherKey", observed=True).sum()}
+    for task_type in by_cell.index.get_level_values("Task").unique():
+        tables[task_type] = by_cell.xs(task_type, level="Task")
+    return {
+        name: (table[metrics].div(table["Total"], axis=0) * 100, table["Total"])
+        for name, table in tables.items()
+    }
+
+
+def comparison_figure(percent, totals):
+    """Teacher x metric heatmap of percent Yes, one row per teacher"""
+    fig = go.Figure(go.Heatmap(
+        z=percent.to_numpy(),
+        x=list(percent.columns),
+        y=[str(teacher).capitalize() for teacher in percent.index],
+        customdata=np.repeat(totals.to_numpy()[:, None], len(percent.columns), axis=1),
+        zmin=0,
+        zmax=100,
+        colorscale=[[0, BG_COLOR], [1, "#268bd2"]],
+        texttemplate="%{z:.0f}",
+        hovertemplate="<b>%{y}</b><br>%{x}: %{z:.0f}% (n=%{customdata})<extra></extra>",
+        colorbar=dict(title="%", thickness=12),
+    ))
+    fig.update_layout(
+        # Grows with the roster so every teacher keeps a readable row
+        height=max(300, 24 * len(percent) + 80),
+        margin=dict(l=40, r=20, t=30, b=40),
+        yaxis=dict(autorange="reversed"),
+        xaxis=dict(side="top"),
+        paper_bgcolor=PLOT_BG,
+        plot_bgcolor=PLOT_BG,
+        font=dict(color=TEXT_COLOR, size=10),
+    )
+    return fig
@@ -0,0 +1,96 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from dataclasses import dataclass
+
+import pandas as pd
+
+from analytics import TASK_TYPES, PairCounts
+
+# Official teachers, by last name; responses naming anyone else are dropped
+TEACHERS = [
+    "ancheta", "haskell", "walker", "thielk", "kagawa", "hashimoto", "jerome",
+    "ramos", "azeez", "wibberley", "ebato", "yagi", "kaanaana",
+]
+
+# Yes/No items in the correlation tables
+CORRELATION_ITEMS = ["Engaged", "Choice", "Prepared", "Confused", "LikedPartner", "ShowLearning"]
+ALL_TASKS = "All Tasks"
+
+
+@dataclass(frozen=True)
+class Selection:
+    """One teacher, or all teachers when ``teacher`` is None, over From..To inclusive.
+
+    ``responses`` and ``reflections`` are the matching rows and ``counts``
+    the matching cube counts; everything the dashboard and the reports
+    show is derived from these.
+    """
+    version: str
+    teacher: str
+    start: object
+    end: object
+    responses: pd.DataFrame
+    counts: pd.DataFrame
+    reflections: pd.DataFrame
+
+    @property
+    def key(self):
+        """What the derived figures and tables depend on, for caching them"""
+        return (self.version, self.teacher, self.start, self.end)
+
+
+def select(snapshot, teacher, start, end):
+    """Rows and counts for a teacher and date range; the To date includes that whole day"""
+    # The indexes keep each teacher's rows together in time order, so this is a
+    # binary search, not a row scan
+    range_start = pd.to_datetime(start)
+    range_stop = pd.to_datetime(end) + pd.Timedelta(days=1)
+    return Selection(
+        version=snapshot.version,
+        teacher=teacher,
+        start=start,
+        end=end,
+        responses=snapshot.students.slice(range_start, range_stop, teacher=teacher),
+        # Yes/total counts per teacher, task and instance, read from the
+        # pre-aggregated cube instead of recounting rows
+        counts=snapshot.cube.query(start, end, teacher=teacher),
+        reflections=snapshot.teachers.slice(range_start, range_stop, teacher=teacher),
+    )
+
+
+def metric_percentages(counts, metrics):
+    """Percent Yes for each metric over all the counted responses (0 without responses)"""
+    total = counts["Total"].sum()
+    return pd.Series({metric: counts[metric].sum() / total * 100 if total > 0 else 0 for metric in metrics})
+
+
+def task_table(counts, metrics):
+    """Responses and percent Yes per task, with an all-tasks row last"""
+    by_task = counts.groupby("Task", observed=True)[["Total"] + metrics].sum()
+    by_task = by_task.reindex([task for task in TASK_TYPES if task in by_task.index])
+    by_task.loc[ALL_TASKS] = counts[["Total"] + metrics].sum()
+    table = by_task[metrics].div(by_task["Total"].where(by_task["Total"] > 0), axis=0).mul(100).round(1)
+    table.insert(0, "Total", by_task["Total"])
+    table.index.name = "Task"
+    return table
+
+
+def correlations(responses, items=CORRELATION_ITEMS):
+    """Pairwise Yes/No counts per task and over all tasks, from one pass over the rows"""
+    by_task = PairCounts.by_group(responses, items)
+    by_task[ALL_TASKS] = PairCounts.total(by_task.values(), items)
+    return by_task
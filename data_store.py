@@ -0,0 +1,660 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, each process refreshes on its own
+    fcntl = None
+
+from analytics import MetricsCube, TimeIndex, assign_instances
+from search import COMMENT_COLUMNS, REFLECTION_COLUMNS, TextIndex
+from sheets_client import SheetsClient, SheetsUnavailable
+from telemetry import span
+
+logger = logging.getLogger(__name__)
+
+# Constants
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+STUDENT_SHEET_ID = "12eUyUTZti7_1TzcGXZumY_ZvIRa9U1wXBESAdos-ODo"
+TEACHER_SHEET_ID = "1G24hVKlg-8TdYUb655z16bURreQZWByPNPurwidYFdE"
+SHEET_NAME = "Form Responses 1"
+FIRST_DATA_ROW = 2  # Row 1 holds the form's question headers
+TIMESTAMP_FORMAT = "%m/%d/%Y %H:%M:%S"
+
+STUDENT_COLUMNS = [
+    "Timestamp", "TeacherLastName", "Grade", "Task",
+    "LikedPartner", "DislikePartnerReason", "Choice", "ShowLearning",
+    "Engaged", "Confused", "Prepared", "LikedText", "DislikedText"
+]
+TEACHER_COLUMNS = [
+    "Timestamp", "Email", "FullName", "GradeLevel", "TaskType",
+    "WentWell", "Struggled", "Concerns", "Revisions", "Principles", "Other"
+]
+
+# Yes/No survey items, stored as nullable booleans (blank or unexpected answers become <NA>)
+YES_NO_COLUMNS = ["Engaged", "Confused", "Choice", "Prepared", "LikedPartner", "ShowLearning"]
+YES_NO_VALUES = {"Yes": True, "No": False}
+
+
+def load_credentials():
+    """Service account credentials from the environment or credentials.json"""
+    # Check for base64 encoded credentials in environment variable (for Railway)
+    creds_b64 = os.getenv("GOOGLE_CREDENTIALS_BASE64")
+
+    if creds_b64:
+        creds_dict = json.loads(base64.b64decode(creds_b64))
+        return service_account.Credentials.from_service_account_info(
+            creds_dict, scopes=SCOPES
+        )
+
+    # Use local credentials.json file
+    return service_account.Credentials.from_service_account_file(
+        "credentials.json",
+        scopes=SCOPES
+    )
+
+
+def build_sheets_service():
+    """Build a Sheets v4 client from the service account credentials"""
+    return build("sheets", "v4", credentials=load_credentials())
+
+
+def sheet_range(last_column, start_row=FIRST_DATA_ROW):
+    """A1 range from start_row down to the end of the response sheet"""
+    return f"{SHEET_NAME}!A{start_row}:{last_column}"
+
+
+def _frame(values, columns, start):
+    # The API drops trailing empty cells, so pad short rows out to the full width
+    rows = [row + [""] * (len(columns) - len(row)) for row in values]
+    # Index rows by their position in the sheet so appended batches line up
+    return pd.DataFrame(rows, columns=columns, index=pd.RangeIndex(start, start + len(rows)))
+
+
+def parse_student_values(values, valid_teachers, start=0):
+    """Build the typed student frame from raw sheet rows, keeping only official teachers"""
+    student_df = _frame(values, STUDENT_COLUMNS, start)
+
+    # Filter to only include teachers in USERS list (exclude non-official teachers)
+    teacher_key = student_df["TeacherLastName"].str.lower().str.strip()
+    keep = teacher_key.isin(valid_teachers)
+    student_df = student_df[keep].copy()
+
+    student_df["Timestamp"] = pd.to_datetime(student_df["Timestamp"], format=TIMESTAMP_FORMAT, errors="coerce")
+    student_df["TeacherKey"] = pd.Categorical(teacher_key[keep], categories=sorted(valid_teachers))
+    student_df["Task"] = student_df["Task"].astype("category")
+    student_df["Grade"] = student_df["Grade"].astype("category")
+    for column in YES_NO_COLUMNS:
+        student_df[column] = student_df[column].map(YES_NO_VALUES).astype("boolean")
+    return student_df
+
+
+def parse_teacher_values(values, valid_teachers, start=0):
+    """Build the teacher reflections frame from raw sheet rows, keeping only official teachers"""
+    teacher_df = _frame(values, TEACHER_COLUMNS, start)
+
+    # Match against last names in FullName (case insensitive)
+    teacher_key = teacher_df["FullName"].str.lower().str.split().str[-1]
+    keep = teacher_key.isin(valid_teachers)
+    teacher_df = teacher_df[keep].copy()
+
+    teacher_df["Timestamp"] = pd.to_datetime(teacher_df["Timestamp"], format=TIMESTAMP_FORMAT, errors="coerce")
+    teacher_df["TeacherKey"] = pd.Categorical(teacher_key[keep], categories=sorted(valid_teachers))
+    return teacher_df
+
+
+def append_rows(df, new_rows):
+    """Concatenate parsed batches, merging categories so columns stay categorical"""
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype) and df[column].dtype != new_rows[column].dtype:
+            merged = pd.api.types.union_categoricals([df[column], new_rows[column]])
+            df = df.assign(**{column: pd.Categorical(df[column], categories=merged.categories)})
+            new_rows = new_rows.assign(**{column: pd.Categorical(new_rows[column], categories=merged.categories)})
+    return pd.concat([df, new_rows])
+
+
+def fingerprint(*tables, base=""):
+    """Content hash of raw sheet rows, used as the data version.
+
+    Passing the previous version as ``base`` chains the hash over appended rows.
+    """
+    digest = hashlib.sha1(base.encode())
+    for rows in tables:
+        digest.update(str(len(rows)).encode())
+        for row in rows:
+            digest.update("\x1f".join(row).encode())
+            digest.update(b"\x1e")
+    return digest.hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class SheetSpec:
+    """Where a form's responses live"""
+    spreadsheet_id: str
+    last_column: str
+
+
+STUDENT_SHEET = SheetSpec(STUDENT_SHEET_ID, "M")
+TEACHER_SHEET = SheetSpec(TEACHER_SHEET_ID, "K")
+
+
+@dataclass(frozen=True)
+class SheetCursor:
+    """How far into a sheet we have ingested: raw row count and the last raw row"""
+    rows: int = 0
+    last_row: list = field(default_factory=list)
+
+    @classmethod
+    def after(cls, values, previous=None):
+        if not values:
+            return previous or cls()
+        return cls(rows=(previous.rows if previous else 0) + len(values), last_row=values[-1])
+
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    """Parsed student and teacher frames from one load of both sheets.
+
+    Both frames are held in a TimeIndex: partitioned by TeacherKey and sorted
+    by time, so a teacher and date range is a binary-searched slice. Student
+    rows carry an ``Instance`` column numbering each teacher's task cycles
+    over their full history, ``cube`` holds the pre-aggregated Yes/No
+    counts, and ``comment_index``/``reflection_index`` rank the free-text
+    answers against a question; all are computed once per data version.
+    """
+    students: TimeIndex
+    teachers: TimeIndex
+    version: str
+    loaded_at: float
+    full_loaded_at: float = 0.0
+    student_cursor: SheetCursor = field(default_factory=SheetCursor)
+    teacher_cursor: SheetCursor = field(default_factory=SheetCursor)
+    cube: MetricsCube = None
+    comment_index: TextIndex = None
+    reflection_index: TextIndex = None
+
+    @property
+    def student_df(self):
+        return self.students.df
+
+    @property
+    def teacher_df(self):
+        return self.teachers.df
+
+    @property
+    def age(self):
+        return time.time() - self.loaded_at
+
+
+class SnapshotStore:
+    """Cleaned frames persisted on disk as uncompressed Arrow/Feather files.
+
+    Each version is written to its own directory and then published by
+    atomically replacing the ``CURRENT`` pointer, so readers never see a
+    half-written snapshot. Uncompressed Feather files can be memory-mapped,
+    which keeps cold starts to a disk read rather than a network round trip,
+    and lets processes reading the same version share its pages.
+
+    ``refresh_lock`` serializes refreshes across every process using the
+    directory. It is an ``flock``, so it is released if its holder dies.
+    """
+
+    POINTER = "CURRENT"
+    LOCK = "LOCK"
+    # Seconds to wait for another process's refresh before going ahead anyway
+    LOCK_TIMEOUT = 120
+    LOCK_POLL = 0.1
+
+    def __init__(self, directory, keep=2):
+        self.directory = directory
+        self.keep = keep
+
+    def save(self, snapshot):
+        os.makedirs(self.directory, exist_ok=True)
+        target = os.path.join(self.directory, snapshot.version)
+        if not os.path.isdir(target):
+            staging = tempfile.mkdtemp(dir=self.directory, prefix=".staging-")
+            for name, df in (("student", snapshot.student_df), ("teacher", snapshot.teacher_df)):
+                table = pa.Table.from_pandas(df, preserve_index=True)
+                feather.write_feather(table, os.path.join(staging, f"{name}.feather"), compression="uncompressed")
+            os.replace(staging, target)
+
+        meta = {
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at,
+            "full_loaded_at": snapshot.full_loaded_at,
+            "student_cursor": [snapshot.student_cursor.rows, snapshot.student_cursor.last_row],
+            "teacher_cursor": [snapshot.teacher_cursor.rows, snapshot.teacher_cursor.last_row],
+        }
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix=".pointer-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f)
+        os.replace(path, os.path.join(self.directory, self.POINTER))
+        self._prune(snapshot.version)
+
+    def load(self, text_indexes=True):
+        """Return the published snapshot, or None if nothing has been saved yet.
+
+        ``text_indexes=False`` skips building the comment and reflection
+        search indexes, for callers that never search.
+        """
+        meta = self.current()
+        if meta is None:
+            return None
+
+        target = os.path.join(self.directory, meta["version"])
+        frames = {
+            name: feather.read_table(os.path.join(target, f"{name}.feather"), memory_map=True).to_pandas()
+            for name in ("student", "teacher")
+        }
+        return DataSnapshot(
+            students=TimeIndex(frames["student"]),
+            cube=MetricsCube.build(frames["student"], YES_NO_COLUMNS),
+            comment_index=TextIndex.build(frames["student"], COMMENT_COLUMNS) if text_indexes else None,
+            teachers=TimeIndex(frames["teacher"]),
+            reflection_index=TextIndex.build(frames["teacher"], REFLECTION_COLUMNS) if text_indexes else None,
+            version=meta["version"],
+            loaded_at=meta["loaded_at"],
+            full_loaded_at=meta["full_loaded_at"],
+            student_cursor=SheetCursor(*meta["student_cursor"]),
+            teacher_cursor=SheetCursor(*meta["teacher_cursor"]),
+        )
+
+    @contextmanager
+    def refresh_lock(self):
+        """Held while one process refreshes the data for every process sharing the directory"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, self.LOCK), "a") as lock_file:
+            locked = self._acquire(lock_file)
+            try:
+                yield
+            finally:
+                if locked:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _acquire(self, lock_file):
+        if fcntl is None:
+            return False
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    logger.warning("Another process has held %s for over %ds; refreshing anyway",
+                                   lock_file.name, self.LOCK_TIMEOUT)
+                    return False
+                time.sleep(self.LOCK_POLL)
+
+    def current(self):
+        """Metadata of the published snapshot, without reading the frames"""
+        try:
+            with open(os.path.join(self.directory, self.POINTER)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _prune(self, current_version):
+        versions = [
+            entry for entry in os.scandir(self.directory)
+            if entry.is_dir() and not entry.name.startswith(".") and entry.name != current_version
+        ]
+        versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in versions[self.keep - 1:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class DataStore:
+    """Process-wide cache of the parsed sheets, shared by every session.
+
+    Snapshots are reused until they are older than ``ttl`` seconds. Concurrent
+    callers that find the cache stale wait on a single fetch instead of each
+    hitting the Sheets API.
+
+    Form responses are append-only, so a refresh normally asks only for the
+    rows after the last one ingested. The last known row is fetched again as
+    an anchor; if it no longer matches, a row was edited or deleted and the
+    store reloads that sheet in full. A full reload of both also runs every
+    ``full_reload_interval`` seconds to pick up edits further up the sheets.
+    Both anchors are read in one batched HTTP request, so a refresh that
+    finds nothing new costs one small request, and sheets that are fetched
+    in full are fetched in parallel.
+
+    With a ``snapshot_store`` the first request is served straight from disk
+    while a background thread reconciles with Sheets, and every new version
+    is written back. ``offline`` serves only from the disk snapshot and never
+    touches the network.
+
+    With ``background`` a refresher thread polls the sheets every ``ttl``
+    seconds and swaps each new snapshot in whole, so readers keep getting
+    the previous one until the next is complete and never wait on Sheets
+    themselves. Only the very first load, with nothing on disk, blocks.
+
+    Several processes (replicas) can share one ``snapshot_store``. Refreshes
+    take the store's lock, and a process that finds a snapshot published
+    less than ``ttl`` seconds ago reads it from disk instead of calling
+    Sheets, so adding replicas does not add Sheets traffic. A forced
+    ``refresh(full=True)`` always fetches.
+
+    Reads go through a SheetsClient, which paces them to the API quota and
+    retries transient failures. If Sheets stays throttled or down, the store
+    keeps serving the last good snapshot and tries again ``RETRY_DELAY``
+    seconds later.
+    """
+
+    # Seconds before a failed refresh is retried
+    RETRY_DELAY = 60
+
+    def __init__(self, valid_teachers, ttl=300, full_reload_interval=3600,
+                 service_factory=build_sheets_service, snapshot_store=None, offline=False, background=False):
+        self.valid_teachers = list(valid_teachers)
+        self.ttl = ttl
+        self.full_reload_interval = full_reload_interval
+        self.snapshot_store = snapshot_store
+        self.offline = offline
+        self.background = background
+        self._client = SheetsClient(service_factory)
+        self._retry_at = 0.0
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._reconciler = None
+        self._refresher = None
+        self._wake = threading.Event()
+        self._full_requested = False
+
+    def get(self):
+        """Return the cached snapshot, syncing it first if missing or expired"""
+        snapshot = self._snapshot
+        if snapshot is not None and not self._expired(snapshot):
+            return snapshot
+
+        with self._lock:
+            # Another session may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+            if snapshot is None and self.snapshot_store is not None:
+                snapshot = self._snapshot = self._load_from_disk()
+            if snapshot is not None:
+                self._start_refresher()
+            if snapshot is None or self._expired(snapshot):
+                try:
+                    snapshot = self._snapshot = self._sync(snapshot)
+                except SheetsUnavailable:
+                    if snapshot is None:
+                        raise
+                    # Throttled or down: keep serving the last good data and try again later
+                    logger.warning("Sheets unavailable; serving data from %.0fs ago", snapshot.age, exc_info=True)
+                    self._retry_at = time.time() + self.RETRY_DELAY
+                self._start_refresher()
+        return snapshot
+
+    def refresh(self, full=True):
+        """Reload now, regardless of the TTL"""
+        if self.offline:
+            return self.get()
+        with self._lock:
+            snapshot = self._snapshot = self._sync(None if full else self._snapshot, force=full)
+        return snapshot
+
+    def request_refresh(self, full=True):
+        """Reload soon without waiting for it: wakes the refresher, or reloads inline without one"""
+        if not self._refreshing_in_background():
+            self.refresh(full=full)
+            return
+        self._full_requested = self._full_requested or full
+        self._wake.set()
+
+    def _expired(self, snapshot):
+        if self.offline or self._reconciling() or self._refreshing_in_background() or time.time() < self._retry_at:
+            # Keep serving what we have rather than blocking on the network
+            return False
+        return snapshot.age > self.ttl
+
+    def _reconciling(self):
+        return self._reconciler is not None and self._reconciler.is_alive()
+
+    def _refreshing_in_background(self):
+        return self._refresher is not None and self._refresher.is_alive()
+
+    def _start_refresher(self):
+        if self.background and not self.offline and self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="data-refresher", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        # A snapshot read from disk may already be stale, in which case this starts at once
+        delay = max(self.ttl - self._snapshot.age, 0)
+        while True:
+            if self._wake.wait(delay):
+                self._wake.clear()
+            full, self._full_requested = self._full_requested, False
+            try:
+                snapshot = self.refresh(full=full)
+                # Another process may have refreshed a little earlier; follow its schedule
+                delay = min(max(self.ttl - snapshot.age, 0), self.ttl)
+            except Exception:
+                logger.exception("Background data refresh failed; serving the previous snapshot")
+                delay = min(self.ttl, self.RETRY_DELAY)
+
+    def _load_from_disk(self):
+        with span("snapshot_load"):
+            snapshot = self.snapshot_store.load()
+        if snapshot is None:
+            if self.offline:
+                raise RuntimeError(f"Offline mode needs a saved snapshot in {self.snapshot_store.directory}")
+            return None
+
+        if not self.offline and not self.background:
+            self._reconciler = threading.Thread(target=self._reconcile, name="snapshot-reconcile", daemon=True)
+            self._reconciler.start()
+        return snapshot
+
+    def _reconcile(self):
+        try:
+            self.refresh(full=False)
+        except Exception:
+            logger.exception("Background sync after loading the disk snapshot failed")
+
+    def _sync(self, previous, force=False):
+        if self.snapshot_store is None:
+            return self._fetch(previous)
+
+        # Processes sharing the snapshot directory refresh one at a time; the others
+        # wait here and then pick up what it published instead of fetching again
+        with self.snapshot_store.refresh_lock():
+            published = self.snapshot_store.current()
+            if published is not None and not force:
+                if previous is None or published["version"] != previous.version:
+                    # Continue from the newest published snapshot, so incremental
+                    # refreshes build on it rather than repeating its fetches
+                    with span("snapshot_load"):
+                        previous = self.snapshot_store.load() or previous
+                if previous is not None and time.time() - published["loaded_at"] < self.ttl:
+                    return replace(previous, loaded_at=published["loaded_at"])
+
+            snapshot = self._fetch(previous)
+            try:
+                # Published even when nothing changed: the new loaded_at tells the
+                # other processes the data was just checked
+                with span("snapshot_save"):
+                    self.snapshot_store.save(snapshot)
+            except OSError:
+                logger.exception("Could not save data snapshot to %s", self.snapshot_store.directory)
+        return snapshot
+
+    def _fetch(self, previous):
+        with span("data_sync", incremental=previous is not None):
+            return self._load(previous)
+
+    def _load(self, previous):
+        if previous is None or time.time() - previous.full_loaded_at > self.full_reload_interval:
+            return self._full_load()
+
+        # One HTTP request re-reads each sheet's last ingested row as an anchor, along
+        # with any rows after it: an unchanged sheet costs a single row
+        sheets = [(STUDENT_SHEET, previous.student_cursor), (TEACHER_SHEET, previous.teacher_cursor)]
+        with span("freshness_probe"):
+            probed = self._client.batch_get([(sheet.spreadsheet_id, self._anchor_range(sheet, cursor))
+                                             for sheet, cursor in sheets])
+        student_values, teacher_values = (
+            self._appended(values, cursor) for values, (_, cursor) in zip(probed, sheets)
+        )
+        if student_values == [] and teacher_values == []:
+            return replace(previous, loaded_at=time.time())
+
+        # A sheet whose anchor no longer matches had rows edited or deleted above it;
+        # only that sheet is reloaded in full (both at once if both changed)
+        stale = [sheet for sheet, values in zip([STUDENT_SHEET, TEACHER_SHEET], (student_values, teacher_values))
+                 if values is None]
+        reloaded = dict(zip(stale, self._client.get_many(
+            [(sheet.spreadsheet_id, sheet_range(sheet.last_column)) for sheet in stale]
+        )))
+        if STUDENT_SHEET in reloaded:
+            student_values = reloaded[STUDENT_SHEET]
+            students, cube, comment_index, student_cursor = self._build_students(student_values)
+        else:
+            students, cube, comment_index, student_cursor = self._build_students(student_values, previous)
+        if TEACHER_SHEET in reloaded:
+            teacher_values = reloaded[TEACHER_SHEET]
+            teachers, reflection_index, teacher_cursor = self._build_teachers(teacher_values)
+        else:
+            teachers, reflection_index, teacher_cursor = self._build_teachers(teacher_values, previous)
+
+        return replace(
+            previous,
+            students=students,
+            teachers=teachers,
+            cube=cube,
+            comment_index=comment_index,
+            reflection_index=reflection_index,
+            version=fingerprint(student_values, teacher_values, base=previous.version),
+            loaded_at=time.time(),
+            student_cursor=student_cursor,
+            teacher_cursor=teacher_cursor,
+        )
+
+    def _full_load(self):
+        # Both sheets at once, each on its own connection
+        student_values, teacher_values = self._client.get_many([
+            (STUDENT_SHEET_ID, sheet_range(STUDENT_SHEET.last_column)),
+            (TEACHER_SHEET_ID, sheet_range(TEACHER_SHEET.last_column)),
+        ])
+        students, cube, comment_index, student_cursor = self._build_students(student_values)
+        teachers, reflection_index, teacher_cursor = self._build_teachers(teacher_values)
+
+        now = time.time()
+        return DataSnapshot(
+            students=students,
+            cube=cube,
+            comment_index=comment_index,
+            teachers=teachers,
+            reflection_index=reflection_index,
+            version=fingerprint(student_values, teacher_values),
+            loaded_at=now,
+            full_loaded_at=now,
+            student_cursor=student_cursor,
+            teacher_cursor=teacher_cursor,
+        )
+
+    def _build_students(self, values, previous=None):
+        """Student frame, cube, comment index and cursor: from every row, or previous plus appended rows"""
+        if previous is None:
+            with span("parse", sheet="student", rows=len(values)):
+                student_df = parse_student_values(values, self.valid_teachers)
+            with span("assign_instances", rows=len(student_df)):
+                student_df = assign_instances(student_df, by="TeacherKey")
+            with span("index", sheet="student", rows=len(student_df)):
+                return (
+                    TimeIndex(student_df),
+                    MetricsCube.build(student_df, YES_NO_COLUMNS),
+                    TextIndex.build(student_df, COMMENT_COLUMNS),
+                    SheetCursor.after(values),
+                )
+        if not values:
+            return previous.students, previous.cube, previous.comment_index, previous.student_cursor
+
+        with span("parse", sheet="student", rows=len(values)):
+            new_rows = parse_student_values(values, self.valid_teachers, start=previous.student_cursor.rows)
+            student_df = append_rows(previous.student_df, new_rows)
+        with span("assign_instances", rows=len(student_df)):
+            student_df = assign_instances(student_df, by="TeacherKey")
+
+        with span("index", sheet="student", rows=len(new_rows)):
+            # Appended rows normally leave earlier instances alone, so only the new
+            # rows need counting; otherwise rebuild the cube from scratch
+            seen = len(previous.student_df)
+            if np.array_equal(student_df["Instance"].to_numpy()[:seen], previous.student_df["Instance"].to_numpy()):
+                cube = previous.cube.add(student_df.iloc[seen:])
+            else:
+                cube = MetricsCube.build(student_df, YES_NO_COLUMNS)
+            return (
+                TimeIndex(student_df),
+                cube,
+                previous.comment_index.add(new_rows),
+                SheetCursor.after(values, previous.student_cursor),
+            )
+
+    def _build_teachers(self, values, previous=None):
+        """Teacher frame, reflection index and cursor: from every row, or previous plus appended rows"""
+        if previous is None:
+            with span("parse", sheet="teacher", rows=len(values)):
+                teacher_df = parse_teacher_values(values, self.valid_teachers)
+            with span("index", sheet="teacher", rows=len(teacher_df)):
+                return TimeIndex(teacher_df), TextIndex.build(teacher_df, REFLECTION_COLUMNS), SheetCursor.after(values)
+        if not values:
+            return previous.teachers, previous.reflection_index, previous.teacher_cursor
+
+        with span("parse", sheet="teacher", rows=len(values)):
+            new_rows = parse_teacher_values(values, self.valid_teachers, start=previous.teacher_cursor.rows)
+        with span("index", sheet="teacher", rows=len(new_rows)):
+            return (
+                TimeIndex(append_rows(previous.teacher_df, new_rows)),
+                previous.reflection_index.add(new_rows),
+                SheetCursor.after(values, previous.teacher_cursor),
+            )
+
+    @staticmethod
+    def _anchor_range(sheet, cursor):
+        """The last ingested row and everything below it (the whole sheet if nothing was ingested)"""
+        return sheet_range(sheet.last_column, FIRST_DATA_ROW + max(cursor.rows - 1, 0))
+
+    @staticmethod
+    def _appended(values, cursor):
+        """Rows appended since ``cursor``, or None if the sheet changed above it"""
+        if cursor.rows == 0:
+            return values
+        if not values or values[0] != cursor.last_row:
+            return None
+        return values[1:]
@@ -14,50 +14,175 @@
  * You should have received a copy of the GNU General Public License
  * along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
+import logging
 import os
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from anthropic import Anthropic
-
-# Solarized Light theme colors
-bg_color = "#fdf6e3"
-text_color = "#657b83"
-plot_bg = "#eee8d5"
-grid_color = "#93a1a1"
+from answer_cache import AnswerCache
+from charts import (
+    COMPARISON_METRICS, GRID_COLOR, PLOT_BG, TEXT_COLOR,
+    comparison_figure, quadrant_figure, scatter_figure, task_points, teacher_rates, trend_figure,
+)
+from compute import TEACHERS, correlations, metric_percentages, select
+from data_store import DataStore, SnapshotStore
+from sheets_client import SheetsUnavailable
+from prompts import (
+    build_data_context, build_question_context, strip_headings, summary_request, system_blocks,
+)
+from telemetry import TELEMETRY, finish_page_run, record_tokens, span, start_metrics_server, start_page_run
 
 # Page config
 st.set_page_config(page_title="PADI Analytics", layout="wide")
 
-# Constants
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-STUDENT_SHEET_ID = "12eUyUTZti7_1TzcGXZumY_ZvIRa9U1wXBESAdos-ODo"
-TEACHER_SHEET_ID = "1G24hVKlg-8TdYUb655z16bURreQZWByPNPurwidYFdE"
-
-USERS = {
-    "admin": os.getenv("ADMIN_PASSWORD", "admin123"),
-    "ancheta": os.getenv("PASSWORD_ANCHETA", "teacher123"),
-    "haskell": os.getenv("PASSWORD_HASKELL", "teacher123"),
-    "walker": os.getenv("PASSWORD_WALKER", "teacher123"),
-    "thielk": os.getenv("PASSWORD_THIELK", "teacher123"),
-    "kagawa": os.getenv("PASSWORD_KAGAWA", "teacher123"),
-    "hashimoto": os.getenv("PASSWORD_HASHIMOTO", "teacher123"),
-    "jerome": os.getenv("PASSWORD_JEROME", "teacher123"),
-    "ramos": os.getenv("PASSWORD_RAMOS", "teacher123"),
-    "azeez": os.getenv("PASSWORD_AZEEZ", "teacher123"),
-    "wibberley": os.getenv("PASSWORD_WIBBERLEY", "teacher123"),
-    "ebato": os.getenv("PASSWORD_EBATO", "teacher123"),
-    "yagi": os.getenv("PASSWORD_YAGI", "teacher123"),
-    "kaanaana": os.getenv("PASSWORD_KAANAANA", "teacher123"),
+# Seconds before cached sheet data is considered stale
+DATA_CACHE_TTL = int(os.getenv("DATA_CACHE_TTL", "300"))
+# Seconds between full reloads; refreshes in between only fetch appended rows
+FULL_RELOAD_INTERVAL = int(os.getenv("FULL_RELOAD_INTERVAL", "3600"))
+# Local copy of the cleaned data for fast cold starts (empty to disable). Processes and
+# replicas sharing the directory also share refreshes: one fetches, the rest read its copy.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", ".snapshots")
+# Serve only from the local snapshot without contacting Google Sheets
+OFFLINE_MODE = os.getenv("OFFLINE_MODE", "").lower() in ("1", "true", "yes")
+# Port for the Prometheus /metrics endpoint (unset to disable)
+METRICS_PORT = os.getenv("METRICS_PORT")
+# Log a JSON line for every timed stage and AI call
+TIMING_LOGS = os.getenv("TIMING_LOGS", "1").lower() in ("1", "true", "yes")
+# Model used for AI Analysis
+AI_MODEL = "claude-haiku-4-5-20251001"
+# Task filter labels and the task names they select
+TASK_FILTERS = {
+    "All": "All Tasks",
+    "T1": "Instructional Task #1",
+    "T2": "Instructional Task #2",
+    "End": "End-of-Unit Performance Task",
 }
+# Shared on-disk cache of AI answers, and how long (seconds) answers stay valid
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", ".cache/answers.sqlite3")
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+# Upper bound, in estimated tokens, on the data block sent with each AI question. The
+# API only caches the block once it passes 4096 tokens, which large selections reach
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "4000"))
+# Estimated tokens kept for the comments and reflections that match the question
+QUESTION_TOKEN_BUDGET = int(os.getenv("QUESTION_TOKEN_BUDGET", "2000"))
+# Question/answer pairs always sent to the AI verbatim; once twice as many have built
+# up, the older ones are folded into a summary in one call
+CHAT_MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", "3"))
+# Messages kept on screen per session
+CHAT_HISTORY_LIMIT = 50
+# Comments and reflections quoted in the AI prompt, ranked by relevance to the question
+PROMPT_COMMENT_LIMIT = 15
+PROMPT_REFLECTION_LIMIT = 10
+# Reflections listed per page, and the fields shown when one is opened
+REFLECTIONS_PER_PAGE = 10
+REFLECTION_FIELDS = [
+    ("TaskType", "Task"),
+    ("WentWell", "Went well"),
+    ("Struggled", "Struggled"),
+    ("Concerns", "Concerns"),
+    ("Revisions", "Revisions"),
+    ("Principles", "Principles"),
+    ("Other", "Other"),
+]
+
+USERS = {"admin": os.getenv("ADMIN_PASSWORD", "admin123")}
+USERS.update({teacher: os.getenv(f"PASSWORD_{teacher.upper()}", "teacher123") for teacher in TEACHERS})
+
+
+@st.cache_resource
+def start_telemetry():
+    """Timing logs and the metrics endpoint, set up once per process"""
+    if TIMING_LOGS:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        telemetry_logger = logging.getLogger("telemetry")
+        telemetry_logger.addHandler(handler)
+        telemetry_logger.setLevel(logging.INFO)
+        telemetry_logger.propagate = False
+    return start_metrics_server(int(METRICS_PORT)) if METRICS_PORT else None
+
+
+@st.cache_resource
+def get_data_store():
+    """One data store per process, shared by all sessions"""
+    # Only include official teachers (exclude responses naming anyone else)
+    return DataStore(
+        TEACHERS,
+        ttl=DATA_CACHE_TTL,
+        full_reload_interval=FULL_RELOAD_INTERVAL,
+        snapshot_store=SnapshotStore(SNAPSHOT_DIR) if SNAPSHOT_DIR else None,
+        offline=OFFLINE_MODE,
+        # Poll the sheets on a background thread so page renders never wait on them
+        background=True,
+    )
+
+
+@st.cache_resource
+def get_answer_cache():
+    """AI answer cache shared by all sessions (and other processes using the same file)"""
+    return AnswerCache(ANSWER_CACHE_PATH, ttl=ANSWER_CACHE_TTL)
+
+
+@st.cache_resource
+def get_anthropic_client():
+    """One Anthropic client per process so its HTTP connection pool is reused"""
+    return Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+
+
+# Figures are cached as objects (cache_resource) rather than pickled (cache_data):
+# unpickling a plotly figure re-validates it, which costs as much as building it.
+# The counts follow from the other arguments, so they are not hashed (leading underscore).
+@st.cache_resource(max_entries=256)
+def trend_chart(version, teacher, start, end, _counts):
+    """Trends figure for one selection, built once per data version"""
+    with span("figures", chart="trend"):
+        return trend_figure(_counts)
+
+
+@st.cache_resource(max_entries=256)
+def correlation_counts(version, teacher, start, end, _rows):
+    """Pairwise Yes/No counts per task, and over all tasks, for one selection"""
+    with span("correlation", rows=len(_rows)):
+        return correlations(_rows)
+
+
+@st.cache_resource(max_entries=256)
+def task_charts(version, teacher, start, end, _counts):
+    """Quadrant and scatter figures for one selection, sharing one set of task points"""
+    with span("figures", chart="tasks"):
+        points = task_points(_counts)
+        return quadrant_figure(points), scatter_figure(points)
+
+
+@st.cache_resource(max_entries=64)
+def comparison_charts(version, start, end, _counts):
+    """Teacher x metric heatmaps for the all-teacher view, one per task plus all tasks"""
+    with span("figures", chart="comparison"):
+        return {
+            task: comparison_figure(percent, totals)
+            for task, (percent, totals) in teacher_rates(_counts, COMPARISON_METRICS).items()
+        }
+
+
+def format_age(seconds):
+    """Human-readable age of the data, e.g. '4 min ago'"""
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return "just now"
+    if minutes < 120:
+        return f"{minutes} min ago"
+    return f"{minutes // 60} h ago"
+
 
 # Initialize session state
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "chat_memory" not in st.session_state:
+    # Recent turns sent with each question, plus a summary of everything before them
+    st.session_state.chat_memory = []
+    st.session_state.chat_summary = ""
 
 # Login check
 if not st.session_state.logged_in:
@@ -78,69 +203,20 @@ if not st.session_state.logged_in:
                 st.error("Invalid credentials")
     st.stop()
 
-# Load Google Sheets data
-# Check for base64 encoded credentials in environment variable (for Railway)
-creds_b64 = os.getenv('GOOGLE_CREDENTIALS_BASE64')
-
-if creds_b64:
-    # Decode from base64
-    import base64
-    import json
-    creds_json = base64.b64decode(creds_b64)
-    creds_dict = json.loads(creds_json)
-    creds = service_account.Credentials.from_service_account_info(
-        creds_dict, scopes=SCOPES
-    )
-else:
-    # Use local credentials.json file
-    creds = service_account.Credentials.from_service_account_file(
-        "credentials.json",
-        scopes=SCOPES
-    )
-
-service = build("sheets", "v4", credentials=creds)
-
-# Load student data
-result = service.spreadsheets().values().get(
-    spreadsheetId=STUDENT_SHEET_ID,
-    range="Form Responses 1!A2:M"
-).execute()
-values = result.get("values", [])
-
-student_df = pd.DataFrame(values, columns=[
-    "Timestamp", "TeacherLastName", "Grade", "Task", 
-    "LikedPartner", "DislikePartnerReason", "Choice", "ShowLearning",
-    "Engaged", "Confused", "Prepared", "LikedText", "DislikedText"
-])
-
-# Parse timestamp
-student_df["Timestamp"] = pd.to_datetime(student_df["Timestamp"], format="%m/%d/%Y %H:%M:%S", errors="coerce")
+# Time this run's stages for the logs, the metrics endpoint and the admin panel
+start_telemetry()
+page_run = start_page_run()
 
-# Filter to only include teachers in USERS list (exclude non-official teachers)
-valid_teachers = [username for username in USERS.keys() if username != "admin"]
-student_df = student_df[
-    student_df["TeacherLastName"].str.lower().str.strip().isin(valid_teachers)
-]
-
-# Load teacher reflections
-result = service.spreadsheets().values().get(
-    spreadsheetId=TEACHER_SHEET_ID,
-    range="Form Responses 1!A2:K"
-).execute()
-values = result.get("values", [])
-
-teacher_df = pd.DataFrame(values, columns=[
-    "Timestamp", "Email", "FullName", "GradeLevel", "TaskType",
-    "WentWell", "Struggled", "Concerns", "Revisions", "Principles", "Other"
-])
-teacher_df["Timestamp"] = pd.to_datetime(teacher_df["Timestamp"], format="%m/%d/%Y %H:%M:%S", errors="coerce")
-
-# Filter to only include teachers in USERS list
-valid_teachers = [username for username in USERS.keys() if username != "admin"]
-# Match against last names in FullName (case insensitive)
-teacher_df = teacher_df[
-    teacher_df["FullName"].str.lower().str.split().str[-1].isin(valid_teachers)
-]
+# Load Google Sheets data (cached per process, shared by every session)
+data_store = get_data_store()
+try:
+    with span("data_get"):
+        snapshot = data_store.get()
+except SheetsUnavailable:
+    # Only reached with no data loaded yet; otherwise the last good data is served
+    st.error("Google Sheets is not responding right now. Please try again in a minute.")
+    st.stop()
+first_response, last_response = snapshot.students.time_range()
 
 # Compact header with filters
 if st.session_state.username == "admin":
@@ -148,13 +224,14 @@ if st.session_state.username == "admin":
     col1, col2, col3, col4 = st.columns([2, 1.5, 1.5, 1])
     with col1:
         st.markdown("### PADI Analytics")
+        st.caption(f"Data updated {format_age(snapshot.age)}")
     with col2:
-        start_date = st.date_input("From", value=student_df["Timestamp"].min(), label_visibility="collapsed")
+        start_date = st.date_input("From", value=first_response, label_visibility="collapsed")
     with col3:
-        end_date = st.date_input("To", value=student_df["Timestamp"].max(), label_visibility="collapsed")
+        end_date = st.date_input("To", value=last_response, label_visibility="collapsed")
     with col4:
         # Get list of teachers from data
-        teacher_list = ["Select a teacher..."] + sorted(student_df["TeacherLastName"].str.lower().str.strip().unique().tolist())
+        teacher_list = ["Select a teacher..."] + sorted(snapshot.students.teachers)
         teacher_filter = st.selectbox(
             "Teacher",
             teacher_list,
@@ -165,15 +242,20 @@ if st.session_state.username == "admin":
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
+        if st.button("Refresh data", help=f"Data loaded {format_age(snapshot.age)}", disabled=OFFLINE_MODE):
+            # The reload runs on the refresher thread; the next rerun picks up the new data
+            data_store.request_refresh()
+            st.toast("Refreshing data in the background")
 else:
     # Teacher view - no teacher filter
     col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
     with col1:
         st.markdown("### PADI Analytics")
+        st.caption(f"Data updated {format_age(snapshot.age)}")
     with col2:
-        start_date = st.date_input("From", value=student_df["Timestamp"].min(), label_visibility="collapsed")
+        start_date = st.date_input("From", value=first_response, label_visibility="collapsed")
     with col3:
-        end_date = st.date_input("To", value=student_df["Timestamp"].max(), label_visibility="collapsed")
+        end_date = st.date_input("To", value=last_response, label_visibility="collapsed")
     with col4:
         if st.button("Logout"):
             for key in list(st.session_state.keys()):
@@ -181,457 +263,248 @@ else:
             st.rerun()
     teacher_filter = None  # Teachers don't get to filter by teacher
 
-# Filter data by date range
-filtered_df = student_df[
-    (student_df["Timestamp"] >= pd.to_datetime(start_date)) & 
-    (student_df["Timestamp"] <= pd.to_datetime(end_date))
-]
-
 # Filter by teacher
 if st.session_state.username == "admin":
-    # Admin can filter by specific teacher or see aggregated data
-    if teacher_filter == "Select a teacher...":
-        # Show aggregated data for all teachers - no filtering
-        pass
-    else:
-        # Filter to specific teacher
-        filtered_df = filtered_df[
-            filtered_df["TeacherLastName"].str.lower().str.strip() == teacher_filter.lower()
-        ]
+    # Admin can filter by specific teacher or see aggregated data (no filtering)
+    selected_teacher = None if teacher_filter == "Select a teacher..." else teacher_filter.lower()
 else:
     # Regular teachers only see their own data
-    filtered_df = filtered_df[
-        filtered_df["TeacherLastName"].str.lower().str.strip() == st.session_state.username.lower()
-    ]
+    selected_teacher = st.session_state.username.lower()
 
-# Two column layout - main dashboard (70%) and AI chat (30%)
-col_main, col_chat = st.columns([7, 3])
+# Rows and cube counts for the selected teacher and date range
+with span("filter", teacher=selected_teacher):
+    current = select(snapshot, selected_teacher, start_date, end_date)
+filtered_df = current.responses
+range_counts = current.counts
+filtered_teacher_df = current.reflections
+# What the figures depend on; charts are cached under this key
+selection = current.key
 
-with col_main:
+
+# Each panel below is a fragment, so its own widgets (radio, search box, chat) rerun
+# only that panel. Changing the header filters still reruns the whole page, which
+# hands every panel the new selection.
+@st.fragment
+def metrics_panel(range_counts, selection):
     # Compact metric cards
-    total = len(filtered_df)
-    
-    if total > 0:
-        engaged_pct = (filtered_df["Engaged"] == "Yes").sum() / total * 100
-        confused_pct = (filtered_df["Confused"] == "Yes").sum() / total * 100
-        choice_pct = (filtered_df["Choice"] == "Yes").sum() / total * 100
-        prepared_pct = (filtered_df["Prepared"] == "Yes").sum() / total * 100
-        partner_pct = (filtered_df["LikedPartner"] == "Yes").sum() / total * 100
-    else:
-        engaged_pct = confused_pct = choice_pct = prepared_pct = partner_pct = 0
+    total = int(range_counts["Total"].sum())
+    percent = metric_percentages(range_counts, ["Engaged", "Confused", "Choice", "Prepared", "LikedPartner"])
     
     m1, m2, m3, m4, m5, m6 = st.columns(6)
-    m1.metric("Engaged", f"{engaged_pct:.0f}%")
-    m2.metric("Confused", f"{confused_pct:.0f}%")
-    m3.metric("Choice", f"{choice_pct:.0f}%")
-    m4.metric("Prepared", f"{prepared_pct:.0f}%")
-    m5.metric("Liked Partner", f"{partner_pct:.0f}%")
+    m1.metric("Engaged", f"{percent['Engaged']:.0f}%")
+    m2.metric("Confused", f"{percent['Confused']:.0f}%")
+    m3.metric("Choice", f"{percent['Choice']:.0f}%")
+    m4.metric("Prepared", f"{percent['Prepared']:.0f}%")
+    m5.metric("Liked Partner", f"{percent['LikedPartner']:.0f}%")
     m6.metric("Total Responses", f"{total}")
     
     # Trend chart by task cycle/instance - always show all tasks
     if total > 0:
         st.write("**Trends Over Time**")
+        fig = trend_chart(*selection, range_counts)
+        if fig is not None:
+            st.plotly_chart(fig, width='stretch')
+
+
+@st.fragment
+def comparison_panel(range_counts, selection):
+    st.write("**Teacher Comparison**")
+    compare_task = st.radio(
+        "Comparison task",
+        list(TASK_FILTERS),
+        horizontal=True,
+        key="compare_task_radio",
+        label_visibility="collapsed",
+    )
+    
+    # Every teacher and task comes from one grouped pass over the cube counts per
+    # selection, so switching task is a lookup
+    version, _, start, end = selection
+    fig = comparison_charts(version, start, end, range_counts).get(TASK_FILTERS[compare_task])
+    if fig is None:
+        st.write("No data")
+    else:
+        st.plotly_chart(fig, width='stretch')
+
+
+@st.fragment
+def relationships_panel(filtered_df, range_counts, selection):
+    total = int(range_counts["Total"].sum())
+    
+    if st.session_state.username == "admin":
+        # Admin view: Show correlation table with task filter
+        rel_task_filter = st.radio(
+            "Correlations",
+            list(TASK_FILTERS),
+            horizontal=True,
+            key="rel_task_radio"
+        )
+        full_task_name = TASK_FILTERS[rel_task_filter]
         
-        # Check if we're in admin view with all teachers (no instance detection for aggregated view)
-        is_aggregated_view = (st.session_state.username == "admin" and teacher_filter == "Select a teacher...")
+        # Every task's counts come from one pass per selection, so the radio is a lookup
+        pair_counts = correlation_counts(*selection, filtered_df).get(full_task_name)
         
-        if is_aggregated_view:
-            # For aggregated admin view, just show simple task breakdown without instances
-            weekly_data = []
-            
-            for task_type in ["Instructional Task #1", "Instructional Task #2", "End-of-Unit Performance Task"]:
-                task_df = filtered_df[filtered_df['Task'] == task_type]
-                
-                if len(task_df) > 0:
-                    task_label = task_type.replace("Instructional Task #", "T").replace("End-of-Unit Performance Task", "End")
-                    
-                    for metric in ["Engaged", "Confused", "Choice", "Prepared"]:
-                        yes_count = (task_df[metric] == "Yes").sum()
-                        total_count = len(task_df)
-                        pct = yes_count / total_count * 100 if total_count > 0 else 0
-                        
-                        weekly_data.append({
-                            'Instance': task_label,
-                            'Metric': metric,
-                            'Percentage': pct,
-                            'Count': f"({yes_count}/{total_count})"
-                        })
-        else:
-            # For single teacher view, detect instances
-            # Sort by timestamp to get chronological order
-            sorted_df = filtered_df.sort_values('Timestamp').copy()
-            
-            # Robust cycle detection: time gaps + End Unit markers
-            # For each task, find instances separated by >14 day gap AND an End Unit in between
+        if pair_counts is not None and pair_counts.n.max() > 0:
+            corr_matrix = pair_counts.phi()
+            ci_low, ci_high = pair_counts.confidence_interval()
             
-            def assign_instances(df):
-                """Assign instance numbers to tasks based on time gaps and End Unit markers"""
-                df = df.copy()
-                df['Instance'] = 1
-                
-                for task_type in ["Instructional Task #1", "Instructional Task #2", "End-of-Unit Performance Task"]:
-                    task_mask = df['Task'] == task_type
-                    task_dates = df[task_mask]['Timestamp'].sort_values()
-                    
-                    if len(task_dates) == 0:
-                        continue
-                    
-                    instance_num = 1
-                    last_date = None
-                    
-                    for idx in task_dates.index:
-                        current_date = df.loc[idx, 'Timestamp']
-                        
-                        if last_date is not None:
-                            # Check for time gap (>14 days)
-                            time_gap = (current_date - last_date).days > 14
-                            
-                            # Check if End Unit occurred between last_date and current_date
-                            end_unit_between = (
-                                (df['Task'] == "End-of-Unit Performance Task") &
-                                (df['Timestamp'] > last_date) &
-                                (df['Timestamp'] < current_date)
-                            ).any()
-                            
-                            # New instance if BOTH conditions met
-                            if time_gap and end_unit_between:
-                                instance_num += 1
-                        
-                        df.loc[idx, 'Instance'] = instance_num
-                        last_date = current_date
-                
-                return df
+            # Display as styled HTML table - 240px to match reflections
+            header = "".join(
+                f'<th style="padding: 10px; text-align: center; font-size: 0.95em;">{item}</th>'
+                for item in corr_matrix.columns
+            )
+            html = f"""
+            <div style="background-color: {PLOT_BG}; padding: 10px; border-radius: 5px; height: 240px; overflow-y: auto;">
+            <table style="width: 100%; border-collapse: collapse; color: {TEXT_COLOR};">
+                <thead>
+                    <tr style="border-bottom: 1px solid {GRID_COLOR};">
+                        <th style="padding: 10px; text-align: left; font-size: 0.95em;"></th>
+                        {header}
+                    </tr>
+                </thead>
+                <tbody>
+            """
             
-            sorted_df = assign_instances(sorted_df)
+            for i, idx in enumerate(corr_matrix.index):
+                html += f'<tr style="border-bottom: 1px solid {GRID_COLOR};">'
+                html += f'<td style="padding: 10px; font-weight: bold; font-size: 0.95em;">{idx}</td>'
+                for j, col in enumerate(corr_matrix.columns):
+                    val = corr_matrix.loc[idx, col]
+                    # Sample size and 95% interval on hover
+                    tooltip = f"n={pair_counts.n[i, j]}"
+                    if pd.notna(ci_low.loc[idx, col]):
+                        tooltip += f", 95% CI {ci_low.loc[idx, col]:.2f} to {ci_high.loc[idx, col]:.2f}"
+                    cell = "–" if pd.isna(val) else f"{val:.2f}"
+                    html += f'<td title="{tooltip}" style="padding: 10px; text-align: center; font-size: 0.95em;">{cell}</td>'
+                html += '</tr>'
             
-            # Show all instances for all tasks
-            weekly_data = []
+            html += """
+                </tbody>
+            </table>
+            </div>
+            """
             
-            for task_type in ["Instructional Task #1", "Instructional Task #2", "End-of-Unit Performance Task"]:
-                task_df = sorted_df[sorted_df['Task'] == task_type]
-                unique_instances = task_df.groupby('Instance')
-                
-                task_label = task_type.replace("Instructional Task #", "T").replace("End-of-Unit Performance Task", "End")
-                
-                for instance_num, instance_data in unique_instances:
-                    for metric in ["Engaged", "Confused", "Choice", "Prepared"]:
-                        yes_count = (instance_data[metric] == "Yes").sum()
-                        total_count = len(instance_data)
-                        pct = yes_count / total_count * 100 if total_count > 0 else 0
-                        
-                        # Only show instance number if > 1
-                        if task_df['Instance'].max() > 1:
-                            label = f"{task_label} I{int(instance_num)}"
-                        else:
-                            label = task_label
-                        
-                        weekly_data.append({
-                            'Instance': label,
-                            'Metric': metric,
-                            'Percentage': pct,
-                            'Count': f"({yes_count}/{total_count})"
-                        })
-        
-        if len(weekly_data) > 0:
-            weekly_melted = pd.DataFrame(weekly_data)
+            st.markdown(html, unsafe_allow_html=True)
+        else:
+            st.write("No data")
+    else:
+        # Teacher view: No radio buttons, just tabs with visualizations
+        if total > 0:
+            tab1, tab2 = st.tabs(["Quadrant", "Scatter Plot"])
+            quadrant, scatter = task_charts(*selection, range_counts)
             
-            # Create bar chart instead of line chart for discrete instances
-            fig = px.bar(
-                weekly_melted,
-                x='Instance',
-                y='Percentage',
-                color='Metric',
-                barmode='group',
-                range_y=[0, 100],
-                custom_data=['Count'],
-                color_discrete_map={
-                    'Engaged': '#ffffff',
-                    'Confused': '#cccccc', 
-                    'Choice': '#999999',
-                    'Prepared': '#666666'
-                }
-            )
+            with tab1:
+                # Single quadrant with all tasks - Prepared vs Confused
+                st.plotly_chart(quadrant, width='stretch')
             
-            # Update hover template
-            fig.update_traces(
-                hovertemplate='<b>%{fullData.name}</b><br>%{y:.0f}% %{customdata[0]}<extra></extra>'
-            )
-        
-        fig.update_layout(
-            yaxis_title="Percent",
-            xaxis_title="",
-            height=300,
-            margin=dict(l=40, r=20, t=30, b=40),
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-            paper_bgcolor=plot_bg,
-            plot_bgcolor=plot_bg,
-            font=dict(color=text_color),
-            xaxis=dict(gridcolor=grid_color),
-            yaxis=dict(gridcolor=grid_color, range=[0, 100])
-        )
-        # Prevent clipping of markers at edges
-        fig.update_traces(cliponaxis=False)
-        st.plotly_chart(fig, width='stretch')
+            with tab2:
+                # Scatter plot with axes and labels
+                st.plotly_chart(scatter, width='stretch')
+        else:
+            st.write("No data")
+
+
+@st.fragment
+def reflections_panel(filtered_teacher_df, selected_teacher, selection):
+    st.write("**Teacher Reflections**")
     
-    # Bottom row - Relationships/Correlations and Teacher Reflections
-    b1, b2 = st.columns(2)
+    # Scrollable container - 240px height
+    reflections_container = st.container(height=475)
     
-    with b1:
-        if st.session_state.username == "admin":
-            # Admin view: Show correlation table with task filter
-            rel_task_filter = st.radio(
-                "Correlations",
-                ["All", "T1", "T2", "End"],
-                horizontal=True,
-                key="rel_task_radio"
-            )
-            
-            # Map short names to full task names
-            task_map = {
-                "All": "All Tasks",
-                "T1": "Instructional Task #1",
-                "T2": "Instructional Task #2",
-                "End": "End-of-Unit Performance Task"
-            }
-            full_task_name = task_map[rel_task_filter]
-            
-            # Filter by task type
-            rel_filtered_df = filtered_df.copy()
-            if full_task_name != "All Tasks":
-                rel_filtered_df = rel_filtered_df[rel_filtered_df["Task"] == full_task_name]
-            
-            if len(rel_filtered_df) > 0:
-                corr_data = rel_filtered_df[["Engaged", "Choice", "Prepared", "Confused"]].copy()
-                corr_data = corr_data.replace({"Yes": 1, "No": 0}).infer_objects(copy=False)
-                corr_data = corr_data.apply(pd.to_numeric, errors="coerce")
-                corr_matrix = corr_data.corr()
-                
-                # Display as styled HTML table - 240px to match reflections
-                html = f"""
-                <div style="background-color: {plot_bg}; padding: 10px; border-radius: 5px; height: 240px; overflow-y: auto;">
-                <table style="width: 100%; border-collapse: collapse; color: {text_color};">
-                    <thead>
-                        <tr style="border-bottom: 1px solid {grid_color};">
-                            <th style="padding: 10px; text-align: left; font-size: 0.95em;"></th>
-                            <th style="padding: 10px; text-align: center; font-size: 0.95em;">Engaged</th>
-                            <th style="padding: 10px; text-align: center; font-size: 0.95em;">Choice</th>
-                            <th style="padding: 10px; text-align: center; font-size: 0.95em;">Prepared</th>
-                            <th style="padding: 10px; text-align: center; font-size: 0.95em;">Confused</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                """
-                
-                for idx in corr_matrix.index:
-                    html += f'<tr style="border-bottom: 1px solid {grid_color};">'
-                    html += f'<td style="padding: 10px; font-weight: bold; font-size: 0.95em;">{idx}</td>'
-                    for col in corr_matrix.columns:
-                        val = corr_matrix.loc[idx, col]
-                        html += f'<td style="padding: 10px; text-align: center; font-size: 0.95em;">{val:.2f}</td>'
-                    html += '</tr>'
-                
-                html += """
-                    </tbody>
-                </table>
-                </div>
-                """
-                
-                st.markdown(html, unsafe_allow_html=True)
-            else:
-                st.write("No data")
+    with reflections_container:
+        if selected_teacher is None:
+            # Admin with no teacher selected - show message instead
+            st.write("*Select a teacher to view reflections*")
+        elif len(filtered_teacher_df) == 0:
+            st.write("*No reflections in this date range*")
         else:
-            # Teacher view: No radio buttons, just tabs with visualizations
-            rel_filtered_df = filtered_df.copy()
+            # One page at a time as a single table; the page widget is keyed by the
+            # selection so it starts over at page 1 when the filters change
+            pages = -(-len(filtered_teacher_df) // REFLECTIONS_PER_PAGE)
+            page = 1
+            if pages > 1:
+                page = st.number_input(
+                    f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"reflection_page:{selection}"
+                )
+            page_df = filtered_teacher_df.iloc[(page - 1) * REFLECTIONS_PER_PAGE:page * REFLECTIONS_PER_PAGE]
             
-            if len(rel_filtered_df) > 0:
-                
-                tab1, tab2 = st.tabs(["Quadrant", "Scatter Plot"])
-                
-                with tab1:
-                    # Single quadrant with all tasks - Prepared vs Confused
-                    import plotly.graph_objects as go
-                    
-                    fig = go.Figure()
-                    
-                    task_configs = [
-                        ("Instructional Task #1", "T1", "circle", "#268bd2"),
-                        ("Instructional Task #2", "T2", "square", "#cb4b16"),
-                        ("End-of-Unit Performance Task", "End", "diamond", "#859900")
-                    ]
-                    
-                    for full_task, label, symbol, color in task_configs:
-                        task_df = rel_filtered_df[rel_filtered_df["Task"] == full_task]
-                        
-                        if len(task_df) > 0:
-                            total = len(task_df)
-                            confused_count = (task_df["Confused"] == "Yes").sum()
-                            prepared_count = (task_df["Prepared"] == "Yes").sum()
-                            
-                            confused_pct = (confused_count / total * 100) if total > 0 else 0
-                            prepared_pct = (prepared_count / total * 100) if total > 0 else 0
-                            
-                            fig.add_trace(go.Scatter(
-                                x=[confused_pct],
-                                y=[prepared_pct],
-                                mode='markers+text',
-                                marker=dict(size=15, color=color, symbol=symbol, opacity=0.7),
-                                text=[label],
-                                textposition="top center",
-                                textfont=dict(size=12, color=text_color),
-                                showlegend=False,
-                                hovertemplate=f"<b>{label}</b><br>Prepared: {prepared_pct:.1f}%<br>Confused: {confused_pct:.1f}%<extra></extra>"
-                            ))
-                    
-                    fig.add_hline(y=50, line_color=grid_color, line_width=1)
-                    fig.add_vline(x=50, line_color=grid_color, line_width=1)
-                    
-                    fig.add_annotation(x=25, y=75, text="More Prepared<br>Less Confused",
-                                      showarrow=False, font=dict(size=14, color=text_color), opacity=0.7)
-                    fig.add_annotation(x=75, y=75, text="More Prepared<br>More Confused",
-                                      showarrow=False, font=dict(size=14, color=text_color), opacity=0.7)
-                    fig.add_annotation(x=25, y=25, text="Less Prepared<br>Less Confused",
-                                      showarrow=False, font=dict(size=14, color=text_color), opacity=0.7)
-                    fig.add_annotation(x=75, y=25, text="Less Prepared<br>More Confused",
-                                      showarrow=False, font=dict(size=14, color=text_color), opacity=0.7)
-                    
-                    fig.update_layout(
-                        xaxis=dict(range=[0, 100], showgrid=False, showticklabels=False, zeroline=False),
-                        yaxis=dict(range=[0, 100], showgrid=False, showticklabels=False, zeroline=False),
-                        height=450,
-                        margin=dict(l=20, r=20, t=20, b=20),
-                        paper_bgcolor=plot_bg,
-                        plot_bgcolor=plot_bg,
-                        font=dict(color=text_color, size=10)
-                    )
-                    
-                    st.plotly_chart(fig, width='stretch')
-                
-                with tab2:
-                    # Scatter plot with axes and labels
-                    import plotly.graph_objects as go
-                    
-                    fig_scatter = go.Figure()
-                    
-                    task_configs = [
-                        ("Instructional Task #1", "T1", "circle", "#268bd2"),
-                        ("Instructional Task #2", "T2", "square", "#cb4b16"),
-                        ("End-of-Unit Performance Task", "End", "diamond", "#859900")
-                    ]
-                    
-                    for full_task, label, symbol, color in task_configs:
-                        task_df = rel_filtered_df[rel_filtered_df["Task"] == full_task]
-                        
-                        if len(task_df) > 0:
-                            total = len(task_df)
-                            confused_count = (task_df["Confused"] == "Yes").sum()
-                            prepared_count = (task_df["Prepared"] == "Yes").sum()
-                            
-                            confused_pct = (confused_count / total * 100) if total > 0 else 0
-                            prepared_pct = (prepared_count / total * 100) if total > 0 else 0
-                            
-                            fig_scatter.add_trace(go.Scatter(
-                                x=[confused_pct],
-                                y=[prepared_pct],
-                                mode='markers+text',
-                                marker=dict(size=15, color=color, symbol=symbol, opacity=0.7),
-                                text=[label],
-                                textposition="top center",
-                                textfont=dict(size=12, color=text_color),
-                                showlegend=False,
-                                hovertemplate=f"<b>{label}</b><br>Prepared: {prepared_pct:.1f}%<br>Confused: {confused_pct:.1f}%<extra></extra>"
-                            ))
-                    
-                    # Add quadrant reference lines
-                    fig_scatter.add_hline(y=50, line_dash="dot", line_color=grid_color, opacity=0.5)
-                    fig_scatter.add_vline(x=50, line_dash="dot", line_color=grid_color, opacity=0.5)
-                    
-                    fig_scatter.update_layout(
-                        xaxis_title="% Confused",
-                        yaxis_title="% Prepared",
-                        xaxis=dict(range=[0, 100], showgrid=False),
-                        yaxis=dict(range=[0, 100], showgrid=False),
-                        height=450,
-                        margin=dict(l=40, r=20, t=30, b=40),
-                        paper_bgcolor=plot_bg,
-                        plot_bgcolor=plot_bg,
-                        font=dict(color=text_color, size=10)
-                    )
-                    
-                    st.plotly_chart(fig_scatter, width='stretch')
-                    
-            else:
-                st.write("No data")
-    
-    with b2:
-        st.write("**Teacher Reflections**")
-        
-        # Filter by date
-        filtered_teacher_df = teacher_df[
-            (teacher_df["Timestamp"] >= pd.to_datetime(start_date)) & 
-            (teacher_df["Timestamp"] <= pd.to_datetime(end_date))
-        ]
-        
-        # Filter by teacher
-        if st.session_state.username == "admin":
-            # Admin view
-            if teacher_filter == "Select a teacher...":
-                # Show message when no teacher selected
-                filtered_teacher_df = filtered_teacher_df[0:0]  # Empty
+            # Short previews for the list, built column-wise for the whole page
+            previews = pd.DataFrame({
+                "Date": page_df["Timestamp"].dt.strftime("%m/%d/%Y"),
+                "Task": page_df["TaskType"],
+                "Went well": page_df["WentWell"].str.slice(0, 60),
+            })
+            event = st.dataframe(
+                previews,
+                hide_index=True,
+                width='stretch',
+                on_select="rerun",
+                selection_mode="single-row",
+                key=f"reflection_rows:{selection}:{page}",
+            )
+            
+            # Full text only for the reflection that was opened
+            if event.selection.rows:
+                row = page_df.iloc[event.selection.rows[0]]
+                st.write(f"**{row['FullName']} - {row['Timestamp'].strftime('%m/%d/%Y')}**")
+                for column, label in REFLECTION_FIELDS:
+                    if row[column]:
+                        st.write(f"**{label}:** {row[column]}")
             else:
-                # Filter to specific teacher
-                filtered_teacher_df = filtered_teacher_df[
-                    filtered_teacher_df["FullName"].str.lower().str.contains(teacher_filter.lower(), na=False)
-                ]
-        else:
-            # Regular teacher view - only their reflections
-            filtered_teacher_df = filtered_teacher_df[
-                filtered_teacher_df["FullName"].str.lower().str.contains(st.session_state.username.lower(), na=False)
-            ]
-        
-        # Scrollable container - 240px height
-        reflections_container = st.container(height=475)
+                st.caption("Select a reflection to read it in full")
+
+
+@st.fragment
+def comment_search_panel(snapshot, filtered_df, filtered_teacher_df):
+    # Search over the current selection, ranked by the same indexes the AI prompt uses
+    comment_query = st.text_input(
+        "Search comments",
+        placeholder="Search student comments and reflections...",
+        label_visibility="collapsed",
+    )
+    if comment_query:
+        comment_matches = snapshot.comment_index.search(comment_query, limit=20, within=filtered_df.index)
+        reflection_matches = snapshot.reflection_index.search(comment_query, limit=10, within=filtered_teacher_df.index)
         
-        with reflections_container:
-            if st.session_state.username == "admin" and teacher_filter == "Select a teacher...":
-                st.write("*Select a teacher to view reflections*")
-            elif len(filtered_teacher_df) == 0:
-                st.write("*No reflections in this date range*")
-            else:
-                for idx, row in filtered_teacher_df.iterrows():
-                    with st.expander(f"{row['FullName']} - {row['Timestamp'].strftime('%m/%d/%Y')}"):
-                        st.write(f"**Task:** {row['TaskType']}")
-                        st.write(f"**Went well:** {row['WentWell']}")
-                        st.write(f"**Struggled:** {row['Struggled']}")
+        with st.container(height=300):
+            if not comment_matches and not reflection_matches:
+                st.write("*No matching comments*")
+            for _, row in filtered_teacher_df.loc[reflection_matches].iterrows():
+                st.write(
+                    f"**{row['FullName']} - {row['Timestamp'].strftime('%m/%d/%Y')}:** "
+                    f"Went well: {row['WentWell']} | Struggled: {row['Struggled']} | "
+                    f"Concerns: {row['Concerns']} | Revisions: {row['Revisions']}"
+                )
+            for _, row in filtered_df.loc[comment_matches].iterrows():
+                st.write(
+                    f"**{row['Timestamp'].strftime('%m/%d/%Y')}:** "
+                    f"Liked: {row['LikedText']} | Disliked: {row['DislikedText']}"
+                )
 
-with col_chat:
+
+@st.fragment
+def chat_panel(snapshot, filtered_df, range_counts, selected_teacher, start_date, end_date):
+    teacher_df = snapshot.teacher_df
     st.write("### AI Analysis")
     
-    # FAQ buttons - 4 buttons in 2x2 grid
+    # FAQ buttons - 4 buttons in 2x2 grid. A click reruns only this panel and is
+    # answered in the same run.
     faq_col1, faq_col2 = st.columns(2)
+    faq_question = None
     
     with faq_col1:
         if st.button("How are my students responding overall?", width='stretch', key="faq1"):
-            st.session_state.pending_question = "How are my students responding overall?"
-            st.rerun()
+            faq_question = "How are my students responding overall?"
         
         if st.button("Do my reflections align with student reports?", width='stretch', key="faq2"):
-            st.session_state.pending_question = "Do my reflections align with student reports?"
-            st.rerun()
+            faq_question = "Do my reflections align with student reports?"
     
     with faq_col2:
         if st.button("Are engaged students also feeling prepared?", width='stretch', key="faq3"):
-            st.session_state.pending_question = "Are engaged students also feeling prepared?"
-            st.rerun()
+            faq_question = "Are engaged students also feeling prepared?"
         
         if st.button("What patterns are present among confused students?", width='stretch', key="faq4"):
-            st.session_state.pending_question = "What patterns are present among confused students?"
-            st.rerun()
+            faq_question = "What patterns are present among confused students?"
     
     # Chat container with increased height
     chat_container = st.container(height=675)
@@ -642,95 +515,189 @@ with col_chat:
             with st.chat_message(message["role"]):
                 st.write(message["content"])
     
-    # Check for pending question from FAQ buttons
-    if "pending_question" in st.session_state:
-        prompt = st.session_state.pending_question
-        del st.session_state.pending_question
+    typed_question = st.chat_input("Ask about the data...")
+    prompt = typed_question or faq_question
+    # FAQ buttons ask standalone questions; only typed ones follow on from the conversation
+    if typed_question:
+        conversation_summary, conversation = st.session_state.chat_summary, st.session_state.chat_memory
     else:
-        prompt = st.chat_input("Ask about the data...")
+        conversation_summary, conversation = "", []
     
     # Chat input
     if prompt:
         st.session_state.chat_history.append({"role": "user", "content": prompt})
+        with chat_container:
+            with st.chat_message("user"):
+                st.write(prompt)
         
-        # Use filtered_df (teacher's own data) instead of full student_df
-        total_all = len(filtered_df)
-        engaged_all = (filtered_df["Engaged"] == "Yes").sum() / total_all * 100 if total_all > 0 else 0
-        confused_all = (filtered_df["Confused"] == "Yes").sum() / total_all * 100 if total_all > 0 else 0
-        choice_all = (filtered_df["Choice"] == "Yes").sum() / total_all * 100 if total_all > 0 else 0
-        prepared_all = (filtered_df["Prepared"] == "Yes").sum() / total_all * 100 if total_all > 0 else 0
-        
-        # Get individual student responses (all filtered data)
-        individual_responses = []
-        for _, row in filtered_df.iterrows():
-            individual_responses.append(
-                f"Student: Engaged={row['Engaged']}, Confused={row['Confused']}, Choice={row['Choice']}, Prepared={row['Prepared']}, LikedPartner={row['LikedPartner']}"
-            )
-        individual_data = "\n".join(individual_responses)
-        
-        # Get recent comments
-        recent = filtered_df.nlargest(15, "Timestamp")
-        comments = "\n".join([
-            f"• Liked: \"{row['LikedText']}\" | Disliked: \"{row['DislikedText']}\""
-            for _, row in recent.iterrows()
-            if row['LikedText'] or row['DislikedText']
-        ])
-        
-        # For admin, include teacher reflections
-        teacher_context = ""
-        if st.session_state.username == "admin":
-            recent_reflections = teacher_df.nlargest(10, "Timestamp")
-            teacher_context = "\n\nRecent Teacher Reflections:\n"
-            for _, row in recent_reflections.iterrows():
-                teacher_context += f"• {row['FullName']}: Went well: \"{row['WentWell']}\" | Struggled: \"{row['Struggled']}\"\n"
-        
-        system_prompt = f"""Analyze student exit ticket data.
-
-        AGGREGATE DATA (n={total_all}):
-        - Engaged: {engaged_all:.0f}%
-        - Confused: {confused_all:.0f}%  
-        - Choice: {choice_all:.0f}%
-        - Prepared: {prepared_all:.0f}%
-
-        INDIVIDUAL STUDENT RESPONSES:
-        {individual_data}
-
-        Sample Student Comments:
-        {comments}{teacher_context}
-
-        Question: {prompt}
-
-        Instructions:
-        - You are a helpful teacher's assistant analyzing exit ticket data
-        - Write 1-2 short paragraphs (3-5 sentences each)
-        - Start directly with your analysis - no preamble
-        - Ground your response in the data: cite specific numbers and patterns
-        - When students mention specific issues, quote them briefly
-        - Be constructive and supportive - focus on insights, not critique
-        - Do not rate or judge lessons, tasks, or teachers' decisions
-        - Use plain language - avoid jargon and academic terminology"""
+        # Repeat questions about exactly the same data are answered from the shared cache
+        answer_cache = get_answer_cache()
+        cache_key = answer_cache.key(
+            prompt,
+            role="admin" if st.session_state.username == "admin" else "teacher",
+            teacher=selected_teacher,
+            start=start_date,
+            end=end_date,
+            version=snapshot.version,
+            model=AI_MODEL,
+            # Follow-ups depend on the conversation before them
+            summary=conversation_summary,
+            memory=conversation,
+        )
+        cached_answer = answer_cache.get(cache_key)
+        answer = None
         
-        try:
-            # Show a spinner while waiting for response
-            with st.spinner("Thinking..."):
-                client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-                response = client.messages.create(
-                    model="claude-haiku-4-5-20251001",
-                    max_tokens=400,
-                    messages=[{"role": "user", "content": system_prompt}]
+        if cached_answer is not None:
+            answer = cached_answer
+            with chat_container:
+                with st.chat_message("assistant"):
+                    st.write(answer)
+        else:
+            with span("prompt_build"):
+                # For admin, include teacher reflections: the most recent ones, and those matching the question
+                if st.session_state.username == "admin":
+                    recent_reflections = teacher_df.nlargest(PROMPT_REFLECTION_LIMIT, "Timestamp")
+                    relevant_reflections = teacher_df.loc[
+                        snapshot.reflection_index.search(prompt, limit=PROMPT_REFLECTION_LIMIT)
+                    ]
+                else:
+                    recent_reflections = relevant_reflections = None
+            
+                # Compact, token-bounded summary of the selection: aggregates, per-task
+                # breakdown, answer-pattern counts and recent comments, the same for every
+                # question so follow-ups reuse the cached prefix
+                data_context = build_data_context(
+                    filtered_df, range_counts, reflections=recent_reflections, token_budget=PROMPT_TOKEN_BUDGET
                 )
+                # The comments and reflections that best match this question, in a budget of their own
+                question_context = build_question_context(
+                    filtered_df,
+                    reflections=relevant_reflections,
+                    relevant_comments=snapshot.comment_index.search(
+                        prompt, limit=PROMPT_COMMENT_LIMIT, within=filtered_df.index
+                    ),
+                    token_budget=QUESTION_TOKEN_BUDGET,
+                )
+        
+            try:
+                # Stream the answer into the chat as it is generated
+                def answer_stream():
+                    with get_anthropic_client().messages.stream(
+                        model=AI_MODEL,
+                        max_tokens=400,
+                        system=system_blocks(data_context, conversation_summary, question_context),
+                        messages=conversation + [{"role": "user", "content": prompt}],
+                    ) as stream:
+                        yield from stream.text_stream
+                        record_tokens(AI_MODEL, stream.get_final_message().usage, call="answer")
                 
-                answer = response.content[0].text
-                
-                # Strip markdown headings (# ## ###) from response
-                import re
-                answer = re.sub(r'^#+\s+.*$', '', answer, flags=re.MULTILINE)
-                answer = answer.strip()
-                
-                st.session_state.chat_history.append({"role": "assistant", "content": answer})
+                with chat_container:
+                    with st.chat_message("assistant"):
+                        with span("llm", call="answer"):
+                            # Markdown headings (# ## ###) are dropped as the text arrives
+                            answer = st.write_stream(strip_headings(answer_stream())).strip()
+                answer_cache.put(cache_key, answer)
             
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
         
-        st.rerun()
-        st.rerun()
+        if answer is not None:
+            st.session_state.chat_history.append({"role": "assistant", "content": answer})
+            del st.session_state.chat_history[:-CHAT_HISTORY_LIMIT]
+            
+            # Keep the last few turns verbatim and fold older ones into the summary,
+            # so the prompt stays bounded however long the conversation gets. Turns
+            # are folded CHAT_MEMORY_TURNS at a time, so only every few answers
+            # cost a second API call
+            memory = st.session_state.chat_memory + [
+                {"role": "user", "content": prompt},
+                {"role": "assistant", "content": answer},
+            ]
+            keep = 2 * CHAT_MEMORY_TURNS
+            if len(memory) >= 2 * keep:
+                older, memory = memory[:-keep], memory[-keep:]
+                try:
+                    with span("llm", call="summary"):
+                        response = get_anthropic_client().messages.create(
+                            model=AI_MODEL,
+                            max_tokens=250,
+                            messages=summary_request(st.session_state.chat_summary, older),
+                        )
+                    record_tokens(AI_MODEL, response.usage, call="summary")
+                    st.session_state.chat_summary = response.content[0].text.strip()
+                except Exception:
+                    # The older turns are dropped either way; only their summary is lost
+                    pass
+            st.session_state.chat_memory = memory
+
+
+def performance_panel(page_run):
+    # Where this run's time went, and how each stage has behaved recently
+    with st.expander("Performance"):
+        st.caption(
+            f"This run: {page_run.elapsed * 1000:.0f} ms. Cached figures only appear when they are built; "
+            "panel interactions and AI answers are counted in the recent runs."
+        )
+        if page_run.spans:
+            st.dataframe(pd.DataFrame(
+                [
+                    {
+                        "Stage": stage,
+                        "ms": round(seconds * 1000, 1),
+                        "Details": ", ".join(f"{key}={value}" for key, value in fields.items()),
+                    }
+                    for stage, seconds, fields in page_run.spans
+                ]
+            ), hide_index=True, width='stretch')
+        if page_run.tokens:
+            st.caption(", ".join(f"{kind.replace('_', ' ')}: {n}" for kind, n in page_run.tokens.items()))
+
+        st.write(f"**Recent runs** (last {TELEMETRY.window} of each stage)")
+        st.dataframe(pd.DataFrame(
+            [
+                {
+                    "Stage": row["stage"],
+                    "Calls": row["count"],
+                    "p50 ms": round(row["p50"] * 1000, 1),
+                    "p95 ms": round(row["p95"] * 1000, 1),
+                }
+                for row in TELEMETRY.stages()
+            ],
+            columns=["Stage", "Calls", "p50 ms", "p95 ms"],
+        ), hide_index=True, width='stretch')
+
+        tokens = TELEMETRY.tokens()
+        if tokens:
+            st.dataframe(pd.DataFrame(
+                [{"Model": model, "Tokens": kind, "Total": n} for (model, kind), n in sorted(tokens.items())]
+            ), hide_index=True, width='stretch')
+
+
+# Two column layout - main dashboard (70%) and AI chat (30%)
+col_main, col_chat = st.columns([7, 3])
+
+with col_main:
+    metrics_panel(range_counts, selection)
+    
+    if selected_teacher is None:
+        # Admin overview: every teacher side by side instead of one at a time
+        comparison_panel(range_counts, selection)
+    
+    # Bottom row - Relationships/Correlations and Teacher Reflections
+    b1, b2 = st.columns(2)
+    
+    with b1:
+        relationships_panel(filtered_df, range_counts, selection)
+    
+    with b2:
+        reflections_panel(filtered_teacher_df, selected_teacher, selection)
+    
+    comment_search_panel(snapshot, filtered_df, filtered_teacher_df)
+
+with col_chat:
+    chat_panel(snapshot, filtered_df, range_counts, selected_teacher, start_date, end_date)
+
+finish_page_run(page_run)
+
+if st.session_state.username == "admin":
+    performance_panel(page_run)
@@ -0,0 +1,288 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from analytics import TASK_TYPES
+
+SUMMARY_METRICS = ["Engaged", "Confused", "Choice", "Prepared"]
+PATTERN_COLUMNS = ["Engaged", "Confused", "Choice", "Prepared", "LikedPartner"]
+ANSWER_LABELS = {True: "Yes", False: "No"}
+# Answer combinations listed in the prompt: the most common ones, each held by
+# at least this share of the responses. The rest are summed up in one line
+PATTERN_LIMIT = 30
+PATTERN_MIN_SHARE = 0.01
+
+# Default size of the data block in the AI prompt, in estimated tokens. Large
+# selections fill it with recent comments, which takes the block past the
+# shortest prefix the API caches (4096 tokens for Claude Haiku 4.5): the API
+# counts about 5,600 tokens for a full block
+DATA_TOKEN_BUDGET = 4000
+# Most recent comments the data block draws on before its budget runs out
+RECENT_COMMENT_LIMIT = 300
+# Default room, in estimated tokens, kept for the comments and reflections
+# chosen for each question, on top of the data block
+QUESTION_TOKEN_BUDGET = 2000
+
+ANALYSIS_INSTRUCTIONS = """You are a helpful teacher's assistant analyzing student exit ticket data.
+
+Instructions:
+- Write 1-2 short paragraphs (3-5 sentences each)
+- Start directly with your analysis - no preamble
+- Ground your response in the data: cite specific numbers and patterns
+- When students mention specific issues, quote them briefly
+- Be constructive and supportive - focus on insights, not critique
+- Do not rate or judge lessons, tasks, or teachers' decisions
+- Use plain language - avoid jargon and academic terminology
+- Follow-up questions refer to the earlier conversation and the same data"""
+
+
+def estimate_tokens(text):
+    """Rough token count: about four characters per token for English text"""
+    return len(text) // 4 + 1
+
+
+def task_label(task_type):
+    return task_type.replace("Instructional Task #", "T").replace("End-of-Unit Performance Task", "End")
+
+
+def _pct(part, whole):
+    return part / whole * 100 if whole > 0 else 0
+
+
+def aggregate_lines(counts):
+    """Overall percentages from cube counts"""
+    total = int(counts["Total"].sum())
+    lines = [f"AGGREGATE DATA (n={total}):"]
+    for metric in SUMMARY_METRICS:
+        lines.append(f"- {metric}: {_pct(counts[metric].sum(), total):.0f}%")
+    return lines
+
+
+def task_lines(counts):
+    """Percentages per task from cube counts"""
+    by_task = counts.groupby("Task", observed=True).sum(numeric_only=True)
+    lines = ["BY TASK:"]
+    for task_type in TASK_TYPES:
+        if task_type not in by_task.index:
+            continue
+        row = by_task.loc[task_type]
+        metrics = ", ".join(f"{metric} {_pct(row[metric], row['Total']):.0f}%" for metric in SUMMARY_METRICS)
+        lines.append(f"- {task_label(task_type)} (n={int(row['Total'])}): {metrics}")
+    return lines
+
+
+def pattern_lines(responses):
+    """How many students gave each combination of answers, most common first.
+
+    This carries the same information as listing every response, but its
+    size is bounded by the number of distinct combinations, not by n.
+    """
+    total = len(responses)
+    patterns = (
+        responses.groupby(PATTERN_COLUMNS, dropna=False, observed=True)
+        .size()
+        .sort_values(ascending=False, kind="stable")
+    )
+    lines = []
+    for answers, count in patterns.items():
+        combo = ", ".join(
+            f"{name}={ANSWER_LABELS.get(answer, 'blank')}" for name, answer in zip(PATTERN_COLUMNS, answers)
+        )
+        lines.append((f"- {combo}: {count} ({_pct(count, total):.0f}%)", count))
+    return lines
+
+
+def recent_comments(responses, limit=RECENT_COMMENT_LIMIT):
+    """The most recent responses with a comment, newest first"""
+    comments = responses[(responses["LikedText"] != "") | (responses["DislikedText"] != "")]
+    return comments.nlargest(limit, "Timestamp")
+
+
+def comment_lines(comments):
+    return [
+        f"• Liked: \"{liked}\" | Disliked: \"{disliked}\""
+        for liked, disliked in zip(comments["LikedText"], comments["DislikedText"])
+    ]
+
+
+def reflection_lines(reflections):
+    lines = []
+    for _, row in reflections.iterrows():
+        line = f"• {row['FullName']}: Went well: \"{row['WentWell']}\" | Struggled: \"{row['Struggled']}\""
+        for column in ("Concerns", "Revisions"):
+            if row[column]:
+                line += f" | {column}: \"{row[column]}\""
+        lines.append(line)
+    return lines
+
+
+class _Budget:
+    """Running token allowance shared by the prompt sections"""
+
+    def __init__(self, tokens):
+        self.remaining = tokens
+
+    def take(self, lines):
+        """Keep lines, in order, while they fit; returns the kept lines"""
+        kept = []
+        for line in lines:
+            cost = estimate_tokens(line)
+            if cost > self.remaining:
+                break
+            self.remaining -= cost
+            kept.append(line)
+        return kept
+
+
+def build_data_context(responses, counts, reflections=None, token_budget=DATA_TOKEN_BUDGET):
+    """Compact description of the selected responses for the AI prompt.
+
+    ``responses`` are the filtered rows and ``counts`` the matching cube
+    counts. Sections are added in priority order - aggregates, per-task
+    breakdown, answer patterns, the given teacher ``reflections``, then the
+    most recent comments - and each is cut off once the token budget is used
+    up, so the prompt stays bounded no matter how many responses are
+    selected. Only the common answer patterns are listed; the long tail of
+    rare ones is summed up in a single line. Nothing here depends on the
+    question, so follow-ups about the same selection send exactly the same
+    text.
+    """
+    budget = _Budget(token_budget)
+    sections = [budget.take(aggregate_lines(counts))]
+
+    by_task = task_lines(counts)
+    if len(by_task) > 1:
+        sections.append(budget.take(by_task))
+
+    patterns = pattern_lines(responses)
+    if patterns:
+        listed = [
+            line for line, count in patterns[:PATTERN_LIMIT] if count >= PATTERN_MIN_SHARE * len(responses)
+        ]
+        # Hold back room for the note about the combinations that get cut
+        note_reserve = 20
+        budget.remaining -= note_reserve
+        kept = budget.take(["ANSWER PATTERNS (students per combination):"] + listed)
+        budget.remaining += note_reserve
+        omitted = patterns[max(len(kept) - 1, 0):]
+        if kept and omitted:
+            kept += budget.take([
+                f"- (+{len(omitted)} rarer combinations covering {sum(count for _, count in omitted)} responses)"
+            ])
+        sections.append(kept)
+
+    if reflections is not None and len(reflections) > 0:
+        sections.append(budget.take(["Recent Teacher Reflections:"] + reflection_lines(reflections)))
+
+    sections.append(budget.take(["Recent Student Comments (newest first):"] + comment_lines(recent_comments(responses))))
+
+    # Drop sections that were cut down to their header alone
+    return "\n\n".join("\n".join(lines) for lines in sections if len(lines) > 1)
+
+
+def build_question_context(responses, reflections=None, relevant_comments=(), token_budget=QUESTION_TOKEN_BUDGET):
+    """Student comments and teacher reflections that match one question.
+
+    ``relevant_comments`` are index labels of ``responses`` and
+    ``reflections`` are rows, both ranked against the question, best first.
+    They have a budget of their own, so a large data block cannot crowd them
+    out.
+    """
+    budget = _Budget(token_budget)
+    sections = []
+
+    if len(relevant_comments):
+        sections.append(budget.take(
+            ["Student Comments most relevant to the question:"] + comment_lines(responses.loc[list(relevant_comments)])
+        ))
+
+    if reflections is not None and len(reflections) > 0:
+        sections.append(budget.take(["Teacher Reflections most relevant to the question:"] + reflection_lines(reflections)))
+
+    return "\n\n".join("\n".join(lines) for lines in sections if len(lines) > 1)
+
+
+def system_blocks(data_context, summary="", question_context=""):
+    """System prompt for a chat turn: instructions, the data, the conversation summary, then the quotes.
+
+    The data block carries a cache breakpoint, so follow-up questions about
+    the same selection reuse the cached instructions and data prefix instead
+    of paying for them again. The API only caches a long enough prefix,
+    which large selections reach. The summary changes every few turns and
+    the quotes chosen for the question every turn, so both come after the
+    breakpoint and never invalidate that prefix.
+    """
+    blocks = [
+        {"type": "text", "text": ANALYSIS_INSTRUCTIONS},
+        {
+            "type": "text",
+            "text": f"Analyze student exit ticket data.\n\n{data_context}",
+            "cache_control": {"type": "ephemeral"},
+        },
+    ]
+    if summary:
+        blocks.append({"type": "text", "text": f"Summary of the earlier conversation:\n{summary}"})
+    if question_context:
+        blocks.append({"type": "text", "text": question_context})
+    return blocks
+
+
+def summary_request(summary, turns):
+    """Messages asking the model to fold older chat turns into the running summary"""
+    transcript = "\n".join(f"{turn['role'].capitalize()}: {turn['content']}" for turn in turns)
+    return [{
+        "role": "user",
+        "content": (
+            f"Summary so far:\n{summary or '(none)'}\n\n"
+            f"Further conversation:\n{transcript}\n\n"
+            "Rewrite the summary so it also covers the further conversation, in at most "
+            "120 words. Keep the questions asked, the numbers cited and the conclusions. "
+            "Reply with the summary only."
+        ),
+    }]
+
+
+def strip_headings(chunks):
+    """Drop markdown heading lines (# ## ###) from streamed text as it arrives.
+
+    Text is passed through as soon as its line is known not to be a heading;
+    only a line's leading '#' characters are held back until the next
+    character decides it. Heading lines keep their newline, matching
+    ``re.sub(r'^#+[ \\t]+.*$', '', text, flags=re.MULTILINE)`` on the full text.
+    """
+    state = "start"  # "start" of a line, inside normal "text", or inside a "heading"
+    pending = ""
+    for chunk in chunks:
+        out = []
+        for char in chunk:
+            if state == "heading":
+                if char == "\n":
+                    out.append(char)
+                    state = "start"
+            elif state == "text":
+                out.append(char)
+                if char == "\n":
+                    state = "start"
+            elif char == "#":
+                pending += char
+            elif pending and char in " \t":
+                pending, state = "", "heading"
+            else:
+                out.append(pending + char)
+                pending, state = "", "start" if char == "\n" else "text"
+        if out:
+            yield "".join(out)
+    if pending:
+        yield pending
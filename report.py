@@ -0,0 +1,147 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+# Per-teacher reports without the dashboard:
+#
+#     python report.py --start 2026-01-05 --end 2026-03-20 --out reports/
+#
+# Writes <teacher>_summary.csv, <teacher>_instances.csv, <teacher>_correlations.csv
+# and <teacher>.html for every teacher, plus roster.csv comparing all of them.
+# Reports are built in parallel worker processes, each reading the same
+# memory-mapped data snapshot.
+import argparse
+import html
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from plotly.offline import get_plotlyjs
+
+from charts import (
+    BG_COLOR, COMPARISON_METRICS, TEXT_COLOR,
+    quadrant_figure, scatter_figure, task_points, teacher_rates, trend_figure, trend_rows,
+)
+from compute import ALL_TASKS, TEACHERS, correlations, select, task_table
+from data_store import YES_NO_COLUMNS, DataStore, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# Snapshot shared by every report written in one worker process
+_snapshot = None
+
+
+def _init_worker(snapshot_dir):
+    global _snapshot
+    _snapshot = SnapshotStore(snapshot_dir).load(text_indexes=False)
+
+
+def _figure_html(fig):
+    # plotly.min.js is written once next to the reports and loaded from the page head
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def write_teacher_report(teacher, start, end, out_dir, snapshot=None):
+    """Write one teacher's CSV tables and HTML report; returns the paths written"""
+    current = select(snapshot or _snapshot, teacher, start, end)
+    summary = task_table(current.counts, YES_NO_COLUMNS)
+    instances = trend_rows(current.counts)
+    pair_counts = correlations(current.responses)[ALL_TASKS]
+    correlation = pair_counts.phi().round(3)
+
+    paths = {
+        "summary": os.path.join(out_dir, f"{teacher}_summary.csv"),
+        "instances": os.path.join(out_dir, f"{teacher}_instances.csv"),
+        "correlations": os.path.join(out_dir, f"{teacher}_correlations.csv"),
+        "html": os.path.join(out_dir, f"{teacher}.html"),
+    }
+    summary.to_csv(paths["summary"])
+    instances.to_csv(paths["instances"], index=False)
+    correlation.to_csv(paths["correlations"])
+
+    title = f"{teacher.capitalize()}: {start:%m/%d/%Y} to {end:%m/%d/%Y}"
+    body = [
+        f"<h1>{html.escape(title)}</h1>",
+        f"<p>{int(current.counts['Total'].sum())} student responses, {len(current.reflections)} reflections</p>",
+        "<h2>Percent Yes by task</h2>",
+        summary.to_html(na_rep="–"),
+    ]
+    trend = trend_figure(current.counts)
+    if trend is not None:
+        body += ["<h2>Trends over time</h2>", _figure_html(trend)]
+    points = task_points(current.counts)
+    if points:
+        body += ["<h2>Prepared vs confused</h2>", _figure_html(quadrant_figure(points)), _figure_html(scatter_figure(points))]
+    body += ["<h2>Correlations (all tasks)</h2>", correlation.to_html(na_rep="–")]
+
+    with open(paths["html"], "w", encoding="utf-8") as f:
+        f.write(
+            "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+            f"<title>{html.escape(title)}</title><script src='plotly.min.js'></script>"
+            f"<style>body {{ background: {BG_COLOR}; color: {TEXT_COLOR}; font-family: sans-serif; margin: 2em; }}"
+            " td, th { padding: 4px 10px; text-align: right; }</style>"
+            f"</head><body>{''.join(body)}</body></html>"
+        )
+    return list(paths.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write per-teacher CSV and HTML reports.")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day (YYYY-MM-DD); default: first response")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day, inclusive; default: last response")
+    parser.add_argument("--out", default="reports", help="output directory (default: reports)")
+    parser.add_argument("--teachers", nargs="+", help="only these teachers (default: everyone with responses)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--snapshot-dir", default=os.getenv("SNAPSHOT_DIR") or ".snapshots",
+                        help="data snapshot shared with the workers (default: $SNAPSHOT_DIR or .snapshots)")
+    parser.add_argument("--offline", action="store_true", help="use the saved snapshot instead of Google Sheets")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    started = time.perf_counter()
+    store = SnapshotStore(args.snapshot_dir)
+    if args.offline:
+        snapshot = store.load(text_indexes=False)
+        if snapshot is None:
+            parser.error(f"no saved snapshot in {args.snapshot_dir}")
+    else:
+        # A fresh load, saved to the store for the workers to memory-map
+        snapshot = DataStore(TEACHERS, snapshot_store=store).refresh()
+
+    first_response, last_response = snapshot.students.time_range()
+    start = args.start or first_response.date()
+    end = args.end or last_response.date()
+    teachers = args.teachers or snapshot.students.teachers
+
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "plotly.min.js"), "w", encoding="utf-8") as f:
+        f.write(get_plotlyjs())
+
+    percent, totals = teacher_rates(snapshot.cube.query(start, end), COMPARISON_METRICS)[ALL_TASKS]
+    percent.round(1).assign(Total=totals).to_csv(os.path.join(args.out, "roster.csv"))
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.snapshot_dir,)) as pool:
+        futures = {pool.submit(write_teacher_report, teacher, start, end, args.out): teacher for teacher in teachers}
+        for future in as_completed(futures):
+            future.result()
+            logger.info("Wrote report for %s", futures[future])
+
+    logger.info("Wrote %d reports to %s in %.1fs", len(teachers), args.out, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
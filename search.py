@@ -0,0 +1,153 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import bisect
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+COMMENT_COLUMNS = ["LikedText", "DislikedText"]
+REFLECTION_COLUMNS = ["WentWell", "Struggled", "Concerns", "Revisions"]
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by do did for from had has have i if in is it its me my no not of on or so "
+    "that the their them then there they this to too us was we were what when which who will with you your".split()
+)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase words without stopwords, with plural 's' folded away"""
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class TextIndex:
+    """BM25 ranking over the free-text columns of a frame.
+
+    Every row with any text is one document, identified by its index label.
+    Postings are append-only lists shared with the index that ``add``
+    returns, so adding rows only tokenizes the new rows. Each index only
+    looks at the documents it had when it was made, so a snapshot that is
+    still being served keeps returning the same results.
+    """
+
+    def __init__(self, columns, k1=1.2, b=0.75):
+        self.columns = list(columns)
+        self.k1 = k1
+        self.b = b
+        # term -> ([doc ids], [term counts], [doc lengths]), doc ids ascending
+        self._postings = {}
+        # doc id -> frame index label
+        self._labels = []
+        self.size = 0
+        self._total_length = 0
+
+    @classmethod
+    def build(cls, df, columns, **params):
+        return cls(columns, **params).add(df)
+
+    def add(self, df):
+        """Return a new index with the rows of df added"""
+        index = self._fork()
+        if len(df) == 0:
+            return index
+
+        # Number documents in index order (sheet row order for the response frames),
+        # so the same rows get the same ranking however the frame was sorted
+        df = df.sort_index()
+        texts = df[self.columns[0]].astype(str)
+        for column in self.columns[1:]:
+            texts = texts + " " + df[column].astype(str)
+
+        for label, text in zip(df.index, texts):
+            terms = tokenize(text)
+            if not terms:
+                continue
+            doc = len(index._labels)
+            for term, count in Counter(terms).items():
+                docs, counts, lengths = index._postings.setdefault(term, ([], [], []))
+                docs.append(doc)
+                counts.append(count)
+                lengths.append(len(terms))
+            index._labels.append(label)
+            index._total_length += len(terms)
+        index.size = len(index._labels)
+        return index
+
+    def _fork(self):
+        fork = TextIndex(self.columns, k1=self.k1, b=self.b)
+        fork._total_length = self._total_length
+        if self.size == len(self._labels):
+            fork._postings, fork._labels, fork.size = self._postings, self._labels, self.size
+            return fork
+
+        # A newer index already extended the shared lists; copy this one's share of them
+        for term, (docs, counts, lengths) in self._postings.items():
+            n = bisect.bisect_left(docs, self.size)
+            if n:
+                fork._postings[term] = (docs[:n], counts[:n], lengths[:n])
+        fork._labels = self._labels[:self.size]
+        fork.size = self.size
+        return fork
+
+    def search(self, query, limit=10, within=None):
+        """Index labels of the documents that best match query, best first.
+
+        ``within`` limits the results to the given labels, e.g. the rows of
+        the current selection. Ties go to the document added last.
+        """
+        if self.size == 0:
+            return []
+        average_length = self._total_length / self.size
+
+        doc_ids, doc_scores = [], []
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            n = bisect.bisect_left(posting[0], self.size)
+            if n == 0:
+                continue
+            docs = np.array(posting[0][:n])
+            counts = np.array(posting[1][:n], dtype=np.float64)
+            lengths = np.array(posting[2][:n], dtype=np.float64)
+            idf = math.log(1 + (self.size - n + 0.5) / (n + 0.5))
+            doc_ids.append(docs)
+            doc_scores.append(
+                idf * counts * (self.k1 + 1)
+                / (counts + self.k1 * (1 - self.b + self.b * lengths / average_length))
+            )
+        if not doc_ids:
+            return []
+
+        docs, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(doc_scores))
+        labels = np.array([self._labels[doc] for doc in docs])
+        if within is not None:
+            keep = np.isin(labels, np.asarray(within))
+            docs, scores, labels = docs[keep], scores[keep], labels[keep]
+
+        order = np.lexsort((-docs, -scores))[:limit]
+        return labels[order].tolist()
@@ -0,0 +1,238 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import logging
+import random
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from telemetry import span
+
+logger = logging.getLogger(__name__)
+
+# Sheets API default read quota per user, per minute
+READS_PER_MINUTE = 60
+# Requests allowed back to back before the bucket starts pacing them
+READ_BURST = 10
+# Statuses worth retrying: rate limited, or the service having a bad moment
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Network failures worth retrying: dropped or timed out connections, DNS
+# lookups that failed (httplib2 reports those as ServerNotFoundError) and
+# broken TLS handshakes
+NETWORK_ERRORS = (ConnectionError, TimeoutError, socket.gaierror, ssl.SSLError, httplib2.ServerNotFoundError)
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 32.0
+# Longest a request waits for a token before giving up
+MAX_TOKEN_WAIT = 60.0
+# Ranges fetched at the same time by get_many
+FETCH_THREADS = 2
+
+
+class SheetsUnavailable(Exception):
+    """Google Sheets kept refusing or failing a request after every retry"""
+
+
+def fetch_values(service, spreadsheet_id, range_name):
+    """Fetch the raw cell values for a range as a list of rows"""
+    with span("sheets_fetch", range=range_name):
+        result = service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=range_name
+        ).execute()
+    return result.get("values", [])
+
+
+class TokenBucket:
+    """Allows ``rate`` calls per second on average and up to ``capacity`` at once"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None, tokens=1):
+        """Take tokens, waiting for them if needed; False if they did not come within timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class Singleflight:
+    """Collapses concurrent calls with the same key into one; the rest wait for its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+
+        try:
+            call.set_result(fn())
+        except BaseException as error:
+            call.set_exception(error)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
+
+
+# Shared by every client in the process, since the quota is per credential, not per client
+READ_BUCKET = TokenBucket(READS_PER_MINUTE / 60, READ_BURST)
+
+
+class SheetsClient:
+    """Reads sheet ranges within the API quota and through its transient failures.
+
+    Identical requests already in flight are shared rather than repeated.
+    Each request first takes a token from the process-wide bucket. 429 and
+    5xx responses and network errors are retried with full-jitter
+    exponential backoff, honoring Retry-After. When every attempt fails the
+    client raises SheetsUnavailable, so callers can keep serving the data
+    they already have.
+
+    The Google client sends requests with httplib2, which is not
+    thread-safe, so every thread gets its own service from
+    ``service_factory``. ``get_many`` fetches ranges in parallel on a small
+    pool of long-lived threads, and ``batch_get`` sends several ranges in a
+    single HTTP request through the Sheets batch endpoint.
+    """
+
+    def __init__(self, service_factory, bucket=READ_BUCKET, max_attempts=MAX_ATTEMPTS,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP, sleep=time.sleep):
+        self._service_factory = service_factory
+        self._local = threading.local()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.bucket = bucket
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._sleep = sleep
+        self._inflight = Singleflight()
+
+    @property
+    def service(self):
+        """This thread's Sheets service"""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._local.service = self._service_factory()
+        return service
+
+    def get_values(self, spreadsheet_id, range_name):
+        """Raw rows for a range, as fetch_values returns them"""
+        return self._inflight.do(
+            (spreadsheet_id, range_name),
+            lambda: self._retrying(range_name, lambda: fetch_values(self.service, spreadsheet_id, range_name)),
+        )
+
+    def get_many(self, requests):
+        """Raw rows for each (spreadsheet id, range), fetched in parallel"""
+        if len(requests) < 2:
+            return [self.get_values(*request) for request in requests]
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=FETCH_THREADS, thread_name_prefix="sheets-fetch")
+        return list(self._pool.map(lambda request: self.get_values(*request), requests))
+
+    def batch_get(self, requests):
+        """Raw rows for each (spreadsheet id, range), all in one HTTP request.
+
+        Ranges in different spreadsheets can share a batch, unlike
+        values().batchGet. Falls back to get_many for services without
+        batch support.
+        """
+        if not hasattr(self.service, "new_batch_http_request"):
+            return self.get_many(requests)
+        ranges = ", ".join(range_name for _, range_name in requests)
+        return self._retrying(ranges, lambda: self._batch(requests), tokens=len(requests))
+
+    def _batch(self, requests):
+        service = self.service
+        responses = {}
+
+        def collect(request_id, response, exception):
+            responses[request_id] = (response, exception)
+
+        batch = service.new_batch_http_request(callback=collect)
+        for i, (spreadsheet_id, range_name) in enumerate(requests):
+            batch.add(service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=range_name),
+                      request_id=str(i))
+        with span("sheets_batch", ranges=len(requests)):
+            batch.execute()
+
+        values = []
+        for i in range(len(requests)):
+            response, exception = responses[str(i)]
+            if exception is not None:
+                raise exception
+            values.append(response.get("values", []))
+        return values
+
+    def _retrying(self, description, call, tokens=1):
+        for attempt in range(self.max_attempts):
+            if not self.bucket.acquire(timeout=MAX_TOKEN_WAIT, tokens=tokens):
+                raise SheetsUnavailable(f"No Sheets quota left for {description} after {MAX_TOKEN_WAIT:.0f}s")
+            try:
+                return call()
+            except HttpError as error:
+                if error.resp.status not in RETRY_STATUSES:
+                    raise
+                failure, retry_after = error, _retry_after(error)
+            except NETWORK_ERRORS as error:
+                failure, retry_after = error, None
+
+            if attempt + 1 == self.max_attempts:
+                raise SheetsUnavailable(f"Sheets request for {description} failed {self.max_attempts} times") from failure
+            # Full jitter keeps replicas that failed together from retrying together
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            logger.warning("Sheets request for %s failed (%s); retry %d in %.1fs",
+                           description, failure, attempt + 1, delay)
+            self._sleep(delay)
+
+
+def _retry_after(error):
+    try:
+        return float(error.resp.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,207 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Recent durations kept per stage for the rolling percentiles
+STAGE_WINDOW = 500
+QUANTILES = (0.5, 0.95)
+TOKEN_KINDS = ["input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens"]
+
+# Spans recorded during the current page run, when one is being collected
+_current_run = ContextVar("current_run", default=None)
+
+
+class Telemetry:
+    """Stage durations and LLM token counts for one process.
+
+    Every stage keeps its call count and total time since startup, plus the
+    last ``window`` durations for rolling p50/p95. Safe to update from the
+    session threads and the background refresher at once.
+    """
+
+    def __init__(self, window=STAGE_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._recent = {}
+        self._count = Counter()
+        self._seconds = Counter()
+        self._tokens = Counter()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self._recent.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+            self._count[stage] += 1
+            self._seconds[stage] += seconds
+
+    def count_tokens(self, model, usage):
+        """Add an Anthropic response's usage; returns the counts it added"""
+        counts = {kind: getattr(usage, kind, None) or 0 for kind in TOKEN_KINDS}
+        with self._lock:
+            for kind, n in counts.items():
+                self._tokens[model, kind] += n
+        return counts
+
+    def stages(self):
+        """Calls, rolling p50/p95 and total seconds per stage, slowest p95 first"""
+        with self._lock:
+            recent = {stage: np.array(durations) for stage, durations in self._recent.items()}
+            count, seconds = dict(self._count), dict(self._seconds)
+        rows = [
+            {
+                "stage": stage,
+                "count": count[stage],
+                **{f"p{int(q * 100)}": float(np.quantile(durations, q)) for q in QUANTILES},
+                "total": seconds[stage],
+            }
+            for stage, durations in recent.items()
+        ]
+        return sorted(rows, key=lambda row: row["p95"], reverse=True)
+
+    def tokens(self):
+        """Token totals as {(model, kind): count}"""
+        with self._lock:
+            return dict(self._tokens)
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP hidash_stage_seconds Time spent in each dashboard stage.",
+            "# TYPE hidash_stage_seconds summary",
+        ]
+        for row in self.stages():
+            stage = _label(row["stage"])
+            for q in QUANTILES:
+                lines.append(f'hidash_stage_seconds{{stage="{stage}",quantile="{q}"}} {row[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'hidash_stage_seconds_sum{{stage="{stage}"}} {row["total"]:.6f}')
+            lines.append(f'hidash_stage_seconds_count{{stage="{stage}"}} {row["count"]}')
+
+        lines += [
+            "# HELP hidash_llm_tokens_total Anthropic API tokens by model and kind.",
+            "# TYPE hidash_llm_tokens_total counter",
+        ]
+        for (model, kind), n in sorted(self.tokens().items()):
+            lines.append(f'hidash_llm_tokens_total{{model="{_label(model)}",kind="{kind.removesuffix("_tokens")}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide metrics
+TELEMETRY = Telemetry()
+
+
+class PageRun:
+    """Spans and LLM tokens recorded during one run of the page script"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # (stage, seconds, fields) in the order the spans finished
+        self.spans = []
+        self.tokens = Counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def start_page_run():
+    """Collect the spans of this thread's page run from here on"""
+    run = PageRun()
+    _current_run.set(run)
+    return run
+
+
+def _log(event, **fields):
+    logger.info(json.dumps({"event": event, **fields}, default=str))
+
+
+@contextmanager
+def span(stage, **fields):
+    """Time the enclosed block as ``stage``; fields go into its log line"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        TELEMETRY.observe(stage, seconds)
+        run = _current_run.get()
+        if run is not None:
+            run.spans.append((stage, seconds, fields))
+        _log("span", stage=stage, ms=round(seconds * 1000, 2), **fields)
+
+
+def record_tokens(model, usage, **fields):
+    """Count an Anthropic response's tokens and log them"""
+    counts = TELEMETRY.count_tokens(model, usage)
+    run = _current_run.get()
+    if run is not None:
+        run.tokens.update(counts)
+    _log("llm_tokens", model=model, **counts, **fields)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = TELEMETRY.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would drown out the span logs
+        pass
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Serve /metrics for Prometheus on a daemon thread; returns the server.
+
+    If the port cannot be bound (already in use, say) the dashboard carries
+    on without the endpoint and None is returned.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as error:
+        logger.warning("Not serving metrics: cannot listen on port %d (%s)", port, error)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Serving metrics on port %d", server.server_port)
+    return server
+
+
+def finish_page_run(run):
+    """Record the whole page run as the ``page`` stage"""
+    seconds = run.elapsed
+    TELEMETRY.observe("page", seconds)
+    _log("page", ms=round(seconds * 1000, 2), spans=len(run.spans))
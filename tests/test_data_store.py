@@ -0,0 +1,130 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+# Incremental refreshes of data_store.DataStore against a fresh full load, on
+# synthetic sheets served by the local Sheets stand-in
+import functools
+
+import pandas as pd
+import pytest
+
+import data_store
+from analytics import MetricsCube
+from bench.fake_sheets import FakeSheetsService
+from bench.synthetic import student_rows, teacher_rows
+from compute import TEACHERS
+from data_store import STUDENT_SHEET, STUDENT_SHEET_ID, TEACHER_SHEET, TEACHER_SHEET_ID, DataStore, sheet_range
+from sheets_client import SheetsClient, TokenBucket
+
+STUDENTS, TEACHER_REFLECTIONS = 2000, 60
+APPENDED = 150
+QUERIES = ["confusing instructions", "partner group work", "too hard", "model the first step", "pacing"]
+
+
+@pytest.fixture(autouse=True)
+def unmetered(monkeypatch):
+    # Every store would otherwise share the process-wide quota bucket and wait on it
+    monkeypatch.setattr(data_store, "SheetsClient", functools.partial(SheetsClient, bucket=TokenBucket(1e9, 1e9)))
+
+
+@pytest.fixture
+def rows():
+    return student_rows(STUDENTS + APPENDED), teacher_rows(TEACHER_REFLECTIONS + APPENDED // 50)
+
+
+@pytest.fixture
+def service(rows):
+    students, teachers = rows
+    return FakeSheetsService({STUDENT_SHEET_ID: students[:STUDENTS], TEACHER_SHEET_ID: teachers[:TEACHER_REFLECTIONS]})
+
+
+def _counts(cube, **query):
+    counts = cube.query(**query)
+    return counts.sort_values(MetricsCube.CELL_COLUMNS, ignore_index=True)
+
+
+def _assert_matches_full_load(snapshot, service):
+    full = DataStore(TEACHERS, service_factory=lambda: service).get()
+
+    pd.testing.assert_frame_equal(snapshot.student_df, full.student_df)
+    pd.testing.assert_frame_equal(snapshot.teacher_df, full.teacher_df)
+    assert snapshot.student_cursor == full.student_cursor
+    assert snapshot.teacher_cursor == full.teacher_cursor
+
+    pd.testing.assert_frame_equal(_counts(snapshot.cube), _counts(full.cube))
+    start, end = full.students.time_range()
+    middle = start + (end - start) / 2
+    for teacher in (None, TEACHERS[0]):
+        pd.testing.assert_frame_equal(
+            _counts(snapshot.cube, start=middle, teacher=teacher), _counts(full.cube, start=middle, teacher=teacher)
+        )
+
+    for query in QUERIES:
+        assert snapshot.comment_index.search(query, limit=30) == full.comment_index.search(query, limit=30)
+        assert snapshot.reflection_index.search(query, limit=10) == full.reflection_index.search(query, limit=10)
+
+
+def _full_ranges(service, since):
+    """Spreadsheets fetched in full after the first ``since`` requests"""
+    whole = {sheet.spreadsheet_id: sheet_range(sheet.last_column) for sheet in (STUDENT_SHEET, TEACHER_SHEET)}
+    return {
+        spreadsheet_id for spreadsheet_id, range_name in service.requests[since:] if whole[spreadsheet_id] == range_name
+    }
+
+
+def test_refresh_with_nothing_new_is_one_round_trip(service):
+    store = DataStore(TEACHERS, service_factory=lambda: service)
+    before = store.get()
+    round_trips = service.round_trips
+
+    snapshot = store.refresh(full=False)
+
+    assert service.round_trips - round_trips == 1
+    assert snapshot.version == before.version
+    _assert_matches_full_load(snapshot, service)
+
+
+def test_appended_rows_are_added_without_refetching(service, rows):
+    students, teachers = rows
+    store = DataStore(TEACHERS, service_factory=lambda: service)
+    before = store.get()
+    requests = len(service.requests)
+
+    service.append(STUDENT_SHEET_ID, students[STUDENTS:])
+    service.append(TEACHER_SHEET_ID, teachers[TEACHER_REFLECTIONS:])
+    snapshot = store.refresh(full=False)
+
+    assert _full_ranges(service, requests) == set()
+    assert len(snapshot.student_df) > len(before.student_df)
+    assert len(snapshot.teacher_df) > len(before.teacher_df)
+    _assert_matches_full_load(snapshot, service)
+
+
+def test_edited_last_row_reloads_only_that_sheet(service):
+    store = DataStore(TEACHERS, service_factory=lambda: service)
+    before = store.get()
+    requests = len(service.requests)
+
+    # A student goes back and rewrites what they liked
+    edited = list(service.sheets[STUDENT_SHEET_ID][-1])
+    edited += [""] * (12 - len(edited))
+    edited[11] = "the instructions were confusing but the model helped"
+    service.sheets[STUDENT_SHEET_ID][-1] = edited
+    snapshot = store.refresh(full=False)
+
+    assert _full_ranges(service, requests) == {STUDENT_SHEET_ID}
+    assert snapshot.version != before.version
+    _assert_matches_full_load(snapshot, service)
@@ -0,0 +1,124 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+# analytics.assign_instances against the row-by-row loop it replaced, from the
+# repository root:
+#
+#     pytest tests
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import END_OF_UNIT_TASK, TASK_TYPES, assign_instances
+from bench.legacy import assign_instances_loop, assign_instances_loop_by
+
+T1, T2 = TASK_TYPES[0], TASK_TYPES[1]
+START = pd.Timestamp("2025-08-01 08:00")
+DAY = pd.Timedelta(days=1)
+
+
+def _frame(rng, n, nat_share=0.0, whole_days=False):
+    """Random responses over about seven months, on a shuffled, gappy index.
+
+    With ``whole_days`` most responses share a time of day, so many land
+    exactly a whole number of days apart, including 14 and 15.
+    """
+    if whole_days:
+        seconds = rng.integers(0, 210, n) * 86400 + rng.choice([0, 0, 0, 3600, 86399], n)
+    else:
+        seconds = rng.integers(0, 210 * 86400, n)
+    timestamps = pd.Series(START + pd.to_timedelta(seconds, unit="s"))
+    timestamps[rng.random(n) < nat_share] = pd.NaT
+    # Some responses name a task the dashboard does not know
+    tasks = rng.choice(TASK_TYPES + ["Warm-up"], n, p=[0.4, 0.3, 0.2, 0.1])
+    return pd.DataFrame(
+        {"Timestamp": timestamps.to_numpy(), "Task": pd.Categorical(tasks)},
+        index=rng.permutation(n) * 3 + 7,
+    )
+
+
+def _responses(*rows):
+    """Frame from (days after START, task) pairs; days may be fractional or None for NaT"""
+    return pd.DataFrame({
+        "Timestamp": pd.to_datetime([pd.NaT if days is None else START + days * DAY for days, _ in rows]),
+        "Task": pd.Categorical([task for _, task in rows]),
+    })
+
+
+def _assert_same(df, by=None):
+    expected = assign_instances_loop(df) if by is None else assign_instances_loop_by(df, by)
+    result = assign_instances(df, by=by)
+    pd.testing.assert_index_equal(result.index, df.index)
+    np.testing.assert_array_equal(result["Instance"].to_numpy(), expected["Instance"].to_numpy())
+    return result
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_loop_on_random_frames(seed):
+    rng = np.random.default_rng(seed)
+    df = _frame(rng, int(rng.integers(0, 150)), nat_share=0.05 if seed % 2 else 0.0, whole_days=seed % 3 == 0)
+    _assert_same(df)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_loop_per_teacher(seed):
+    rng = np.random.default_rng(1000 + seed)
+    df = _frame(rng, int(rng.integers(0, 200)), nat_share=0.05, whole_days=seed % 2 == 0)
+    # One teacher never responds, as with a category left over after filtering
+    df["TeacherKey"] = pd.Categorical(rng.choice(["a", "b", "c"], len(df)), categories=["a", "b", "c", "d"])
+    _assert_same(df, by="TeacherKey")
+
+
+def test_matches_loop_on_sorted_frame():
+    df = _frame(np.random.default_rng(99), 120, whole_days=True).sort_values("Timestamp")
+    _assert_same(df)
+
+
+@pytest.mark.parametrize("gap, expected", [
+    (14, 1),
+    (14 + 86399 / 86400, 1),  # .days is still 14
+    (15, 2),
+])
+def test_gap_must_exceed_fourteen_whole_days(gap, expected):
+    df = _responses((0, T1), (7, END_OF_UNIT_TASK), (gap, T1))
+    result = _assert_same(df)
+    assert result["Instance"].tolist() == [1, 1, expected]
+
+
+@pytest.mark.parametrize("end_day, expected", [
+    (0, 1),   # at the earlier response: not strictly between
+    (20, 1),  # at the later response: not strictly between
+    (10, 2),
+])
+def test_end_of_unit_must_fall_strictly_between(end_day, expected):
+    df = _responses((0, T1), (end_day, END_OF_UNIT_TASK), (20, T1))
+    result = _assert_same(df)
+    assert result.loc[result["Task"] == T1, "Instance"].tolist() == [1, expected]
+
+
+def test_missing_timestamps_keep_the_last_instance():
+    df = _responses((None, T2), (0, T2), (10, END_OF_UNIT_TASK), (20, T2), (None, END_OF_UNIT_TASK))
+    result = _assert_same(df)
+    assert result["Instance"].tolist() == [2, 1, 1, 2, 1]
+
+
+def test_unknown_tasks_stay_at_one():
+    df = _responses((0, "Warm-up"), (10, END_OF_UNIT_TASK), (30, "Warm-up"))
+    assert _assert_same(df)["Instance"].tolist() == [1, 1, 1]
+
+
+def test_empty_frame():
+    _assert_same(_responses())
@@ -0,0 +1,50 @@
+"""
+ * Copyright (C) [2026] [Erik Whitfield]
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+# prompts.strip_headings, which filters the AI answer as it streams, against
+# the single-line heading pattern it stands in for
+import random
+import re
+
+import pytest
+
+from prompts import strip_headings
+
+HEADING = re.compile(r"^#+[ \t]+.*$", flags=re.MULTILINE)
+
+
+def _chunked(text, rng, pieces=4):
+    cuts = sorted(rng.sample(range(len(text) + 1), min(pieces - 1, len(text) + 1)))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("## Heading\nBody", "\nBody"),
+    ("#\nfoo", "#\nfoo"),  # a bare '#' is not a heading, and the next line survives
+    ("#tag stays", "#tag stays"),
+    ("Body\n### Last", "Body\n"),
+    ("Not # a heading", "Not # a heading"),
+    ("##", "##"),
+])
+def test_known_cases(text, expected):
+    assert "".join(strip_headings([text])) == expected == HEADING.sub("", text)
+
+
+def test_matches_the_regex_however_the_text_is_chunked():
+    rng = random.Random(1)
+    for _ in range(20_000):
+        text = "".join(rng.choice("#  \t\nab") for _ in range(rng.randint(0, 30)))
+        assert "".join(strip_headings(_chunked(text, rng))) == HEADING.sub("", text), repr(text)